@@ -37,12 +37,19 @@ class DatasetAgent(BaseAgent):
         # set up the agent
         # str: Valid and correct python code that fulfills the user's request.
         var_sections = []
-        for var_name, dataset_obj in agent.context.asset_map.items():
-            df_info = await agent.context.describe_dataset(var_name)
+        omitted = []
+        for var_name, df_info in agent.context.describe_datasets(query=query).items():
+            if df_info is None:
+                omitted.append(var_name)
+                continue
             var_sections.append(f"""
 You have access to a variable name `{var_name}` that is a {agent.context.metadata.get("df_lib_name", "Pandas")} Dataframe with the following structure:
 {df_info}
 --- End description of variable `{var_name}`
+""")
+        if omitted:
+            var_sections.append(f"""
+You also have access to the variables {", ".join(f"`{var_name}`" for var_name in omitted)}, which are {agent.context.metadata.get("df_lib_name", "Pandas")} Dataframes that are not described here.
 """)
         prompt = f"""
 You are a programmer writing code to help with scientific data analysis and manipulation in {agent.context.metadata.get("name", "a Jupyter notebook")}.
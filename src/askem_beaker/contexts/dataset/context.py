@@ -1,16 +1,29 @@
-import codecs
+import asyncio
 import copy
 import datetime
+import hashlib
+import json
+import math
 import os
+import re
+import shutil
+import httpx
 import requests
 from base64 import b64encode
 from typing import TYPE_CHECKING, Any, Dict
 
 from beaker_kernel.lib.context import BaseContext
-from beaker_kernel.lib.utils import intercept
+from beaker_kernel.lib.subkernels.julia import JuliaSubkernel
+from beaker_kernel.lib.subkernels.python import PythonSubkernel
+from beaker_kernel.lib.utils import action, intercept
 
 from .agent import DatasetAgent
-from askem_beaker.utils import get_auth
+from .lib.cache import DatasetCache
+from .lib.descriptions import DescriptionBuilder
+from .lib.formats import (
+    DEFAULT_FORMAT, MAGIC_BYTES_LENGTH, detect_format, filename_for_format, format_from_filename, validate_format
+)
+from askem_beaker.utils import get_auth, hmi_async_client
 
 if TYPE_CHECKING:
     from beaker_kernel.kernel import LLMKernel
@@ -20,6 +33,37 @@ if TYPE_CHECKING:
 import logging
 logger = logging.getLogger(__name__)
 
+# Size in bytes of each chunk emitted when streaming a dataset download to the client.
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("DATASET_DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+MIN_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MAX_DOWNLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+# How many times to attempt a dataset upload that fails to connect or gets a server error.
+UPLOAD_MAX_RETRIES = int(os.environ.get("DATASET_UPLOAD_MAX_RETRIES", 3))
+# Frames with more rows than this get approximate statistics computed from a sample plus single-pass aggregates.
+APPROX_STATS_ROW_THRESHOLD = int(os.environ.get("DATASET_APPROX_STATS_ROW_THRESHOLD", 1_000_000))
+APPROX_STATS_SAMPLE_SIZE = int(os.environ.get("DATASET_APPROX_STATS_SAMPLE_SIZE", 100_000))
+# Seconds of subkernel time each background profiling pass may take before deferring the remaining frames.
+PROFILE_TIME_BUDGET = float(os.environ.get("DATASET_PROFILE_TIME_BUDGET", 2))
+# Default and maximum size of the window returned for a dataset_page_request.
+PAGE_ROW_LIMIT = 100
+MAX_PAGE_ROW_LIMIT = 10_000
+PAGE_COLUMN_LIMIT = 50
+MAX_PAGE_COLUMN_LIMIT = 1_000
+# Ratios of distinct values and of nulls to rows at which optimize_memory makes a column categorical or sparse.
+MEMORY_CATEGORY_RATIO = float(os.environ.get("DATASET_MEMORY_CATEGORY_RATIO", 0.5))
+MEMORY_SPARSE_RATIO = float(os.environ.get("DATASET_MEMORY_SPARSE_RATIO", 0.9))
+# Number of tasks Julia parses CSV files with. Defaults to the number of threads the Julia subkernel was started with.
+JULIA_CSV_NTASKS = os.environ.get("DATASET_JULIA_CSV_NTASKS", None)
+# Maximum number of tokens the descriptions of all dataframes may take up in a prompt.
+DESCRIPTION_TOKEN_BUDGET = int(os.environ.get("DATASET_DESCRIPTION_TOKEN_BUDGET", 6000))
+# Directory holding the named checkpoints of the dataframes in dataset sessions.
+CHECKPOINT_DIR = os.environ.get(
+    "DATASET_CHECKPOINT_DIR", os.path.join(os.path.expanduser("~"), ".cache", "askem_beaker", "checkpoints")
+)
+CHECKPOINT_MANIFEST = "checkpoint.json"
+# Options that may be given alongside an asset id in the setup payload to control how the dataset is loaded.
+LOAD_OPTIONS = ("format", "columns", "row_filter", "nrows", "dtypes")
+
 
 class DatasetContext(BaseContext):
 
@@ -28,6 +72,11 @@ class DatasetContext(BaseContext):
     def __init__(self, beaker_kernel: "LLMKernel", config: Dict[str, Any]) -> None:
         self.auth = get_auth()
         self.asset_map = {}
+        # Version of each dataset preview last sent to the client, used to send only what changed.
+        self.preview_versions = None
+        self.dataset_cache = DatasetCache()
+        self.description_builder = DescriptionBuilder()
+        self.profile_task: asyncio.Task|None = None
         super().__init__(beaker_kernel, self.agent_cls, config)
 
     async def setup(self, context_info: dict, parent_header):
@@ -35,91 +84,281 @@ class DatasetContext(BaseContext):
         await self.set_assets(self.config["context_info"], parent_header=parent_header)
 
     async def post_execute(self, message):
-        await self.update_asset_map(parent_header=message.parent_header)
-        await self.send_df_preview_message(parent_header=message.parent_header)
+        # Profiling happens in the background so the cell completes right away. A newer execution supersedes any
+        # profile that is still in flight.
+        self.cancel_profile()
+        self.profile_task = asyncio.create_task(self.profile_dataframes(parent_header=message.parent_header))
 
-    async def set_assets(self, assets, parent_header={}):
-        self.asset_map = assets
-        for var_name, asset_item in assets.items():
-            if isinstance(asset_item, str):
-                asset_id = asset_item
-                asset_type = "dataset"
-                self.asset_map[var_name] = {
-                    "id": asset_id,
-                    "asset_type": asset_type,
+    def cancel_profile(self):
+        if self.profile_task is not None and not self.profile_task.done():
+            self.profile_task.cancel()
+        self.profile_task = None
+
+    async def profile_dataframes(self, parent_header={}):
+        """
+        Refreshes the asset map in time-budgeted passes, so that queued executions can run in the subkernel
+        between passes, then announces the result with a `dataset_profile_ready` message.
+        """
+        try:
+            while await self.update_asset_map(parent_header=parent_header, time_budget=PROFILE_TIME_BUDGET):
+                pass
+            await self.send_df_preview_message(parent_header=parent_header)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            logger.error(f"Unable to profile dataframes: {err}")
+            return
+        self.beaker_kernel.send_response(
+            "iopub",
+            "dataset_profile_ready",
+            {
+                var_name: {
+                    "columns": df_obj.get("columns"),
+                    "approximate_statistics": df_obj.get("approximate_statistics", False),
                 }
-            elif isinstance(asset_item, dict):
-                asset_id = asset_item["id"]
-                asset_type = asset_item.get("asset_type", "dataset")
-            else:
-                raise ValueError("Unable to parse dataset mapping")
-
-            meta_url = f"{os.environ['HMI_SERVER_URL']}/{asset_type}s/{asset_id}"
-            asset_info_req = requests.get(meta_url, auth=self.auth.requests_auth())
-            if asset_info_req.status_code == 404:
-                raise Exception(f"Dataset '{asset_id}' not found.")
-            asset_info = asset_info_req.json()
-            if asset_info:
-                self.asset_map[var_name]["info"] = asset_info
-            else:
-                raise Exception(f"{asset_type.capitalize()} '{asset_id}' not able to be loaded.")
-        await self.load_dataframes()
-        await self.send_df_preview_message(parent_header=parent_header)
+                for var_name, df_obj in self.asset_map.items()
+            },
+            parent_header=parent_header,
+        )
+
+    async def set_assets(self, assets, parent_header={}):
+        # A profiling pass still running would drop the new entries it didn't see from the asset map.
+        self.cancel_profile()
+        self.asset_map = {}
+        await self.add_assets(assets, parent_header=parent_header)
+        await self.send_df_preview_message(parent_header=parent_header, full=True)
+
+    @staticmethod
+    def parse_asset(asset_item) -> dict:
+        if isinstance(asset_item, str):
+            return {
+                "id": asset_item,
+                "asset_type": "dataset",
+                "load_options": {},
+            }
+        elif isinstance(asset_item, dict):
+            asset = {key: value for key, value in asset_item.items() if key not in LOAD_OPTIONS}
+            asset.setdefault("asset_type", "dataset")
+            # Kept apart from the asset's info, as `columns` is overwritten with what was actually loaded.
+            asset["load_options"] = {
+                option: asset_item[option] for option in LOAD_OPTIONS if asset_item.get(option) is not None
+            }
+            return asset
+        else:
+            raise ValueError("Unable to parse dataset mapping")
+
+    async def add_assets(self, assets, parent_header={}):
+        new_assets = {var_name: self.parse_asset(asset_item) for var_name, asset_item in assets.items()}
+        self.asset_map.update(new_assets)
+
+        # Resolve all assets at once so setup time is bound by the slowest asset rather than the sum of all of them.
+        async with hmi_async_client(self.auth) as client:
+            await asyncio.gather(
+                *(self.fetch_asset_info(client, var_name) for var_name in new_assets)
+            )
+            await self.load_dataframes(client=client, var_names=list(new_assets))
+
+    async def fetch_asset_info(self, client: httpx.AsyncClient, var_name: str):
+        asset_id = self.asset_map[var_name]["id"]
+        asset_type = self.asset_map[var_name]["asset_type"]
+        asset_info_req = await client.get(f"/{asset_type}s/{asset_id}")
+        if asset_info_req.status_code == 404:
+            raise Exception(f"Dataset '{asset_id}' not found.")
+        asset_info = asset_info_req.json()
+        if asset_info:
+            self.asset_map[var_name]["info"] = asset_info
+        else:
+            raise Exception(f"{asset_type.capitalize()} '{asset_id}' not able to be loaded.")
+
+    async def resolve_source(self, client: httpx.AsyncClient, var_name: str) -> dict:
+        df_obj = self.asset_map[var_name]
+        asset_type = df_obj.get("asset_type", "dataset")
+
+        if asset_type != "dataset":
+            filename = df_obj["info"].get("resultFiles", [])[0]
+        else:
+            filename = df_obj["info"].get("fileNames", [])[0]
+
+        data_url_req = await client.get(
+            f"/{asset_type}s/{df_obj['id']}/download-url",
+            params={"filename": filename},
+        )
+        data_url = data_url_req.json().get("url", None)
+        version = df_obj["info"].get("updatedOn") or df_obj["info"].get("createdOn")
+        local_path = await self.dataset_cache.fetch(client, data_url, df_obj["id"], filename, version)
+
+        load_options = df_obj.get("load_options", {})
+        fmt = load_options.get("format") or format_from_filename(filename)
+        if fmt is None:
+            # Unrecognized extension, so sniff the leading bytes of the file.
+            with open(local_path, "rb") as local_file:
+                fmt = detect_format(filename, local_file.read(MAGIC_BYTES_LENGTH))
+        df_obj["filename"] = filename
+        df_obj["format"] = validate_format(fmt)
+        df_obj["cache_key"] = self.dataset_cache.cache_key(df_obj["id"], filename, version)
+
+        options = {option: load_options.get(option) for option in LOAD_OPTIONS if option != "format"}
+        if self.records_dtype_manifest(var_name):
+            options["dtype_hints"] = self.dataset_cache.read_manifest(
+                df_obj["cache_key"], self.subkernel.KERNEL_NAME
+            ) or None
+        return {
+            "path": local_path,
+            "format": df_obj["format"],
+            "options": options,
+        }
 
-    async def load_dataframes(self):
-        var_map = {}
-        for var_name, df_obj in self.asset_map.items():
-            asset_type = df_obj.get("asset_type", "dataset")
+    def records_dtype_manifest(self, var_name: str) -> bool:
+        # Only pandas and CSV.jl can be given types in place of inferring them while reading CSV files, and types
+        # inferred from a subset of the rows may not hold for the rest of the file.
+        df_obj = self.asset_map[var_name]
+        load_options = df_obj.get("load_options", {})
+        return (
+            isinstance(self.subkernel, (PythonSubkernel, JuliaSubkernel))
+            and df_obj.get("format") == "csv"
+            and not load_options.get("row_filter")
+            and load_options.get("nrows") is None
+        )
 
-            if asset_type != "dataset":
-                filename = df_obj["info"].get("resultFiles", [])[0]
-            else:
-                filename = df_obj["info"].get("fileNames", [])[0]
+    async def load_dataframes(self, client: httpx.AsyncClient = None, var_names: list[str] = None):
+        if client is None:
+            async with hmi_async_client(self.auth) as client:
+                return await self.load_dataframes(client=client, var_names=var_names)
 
-            meta_url = f"{os.environ['HMI_SERVER_URL']}/{asset_type}s/{df_obj['id']}"
-            url = f"{meta_url}/download-url?filename={filename}"
-            data_url_req = requests.get(
-                url=url,
-                auth=self.auth.requests_auth(),
-            )
-            data_url = data_url_req.json().get("url", None)
-            var_map[var_name] = data_url
+        if var_names is None:
+            var_names = [var_name for var_name, df_obj in self.asset_map.items() if "id" in df_obj]
+        sources = await asyncio.gather(
+            *(self.resolve_source(client, var_name) for var_name in var_names)
+        )
+        var_map = dict(zip(var_names, sources))
+        for var_name, source in var_map.items():
+            self.asset_map[var_name]["source"] = source
         command = "\n".join(
             [
                 self.get_code("setup"),
-                self.get_code("load_df", {"var_map": var_map, "auth": self.auth}),
+                self.get_code("load_df", {"var_map": var_map, "auth": self.auth, "csv_ntasks": JULIA_CSV_NTASKS}),
             ]
         )
         await self.execute(command)
+        await asyncio.to_thread(self.dataset_cache.evict)
         await self.update_asset_map()
 
+        # Record the types the frames were loaded with so the next load of the same files can skip inferring them.
+        # Columns given explicit types by the load options weren't inferred, so a plain load mustn't be given them.
+        for var_name in var_names:
+            df_obj = self.asset_map.get(var_name, {})
+            if not df_obj.get("dtypes") or not self.records_dtype_manifest(var_name):
+                continue
+            explicit_dtypes = df_obj.get("load_options", {}).get("dtypes") or {}
+            inferred_dtypes = {
+                column: dtype for column, dtype in df_obj["dtypes"].items() if column not in explicit_dtypes
+            }
+            if inferred_dtypes:
+                await asyncio.to_thread(
+                    self.dataset_cache.write_manifest, df_obj["cache_key"], self.subkernel.KERNEL_NAME, inferred_dtypes
+                )
+
     def reset(self):
+        self.cancel_profile()
         self.asset_map = {}
+        self.preview_versions = None
 
-    async def send_df_preview_message(
-        self, server=None, target_stream=None, data=None, parent_header={}
-    ):
-        preview = {
-            var_name: {
+    def build_preview(self) -> dict:
+        preview = {}
+        for var_name, df in self.asset_map.items():
+            entry = {
                 "name": df.get("name"),
                 "headers": df.get("columns"),
                 "csv": df.get("head"),
             }
-            for var_name, df in self.asset_map.items()
-        }
-        self.beaker_kernel.send_response(
-            "iopub", "dataset", preview, parent_header=parent_header
-        )
+            entry["version"] = hashlib.sha1(
+                json.dumps(entry, sort_keys=True, default=str).encode()
+            ).hexdigest()[:16]
+            preview[var_name] = entry
+        return preview
+
+    async def send_df_preview_message(
+        self, server=None, target_stream=None, data=None, parent_header={}, full=False
+    ):
+        """
+        Sends the dataset previews to the client. A full snapshot is sent as a `dataset` message when `full` is set
+        or nothing has been sent yet; otherwise only the previews that were added, changed or removed since the last
+        message are sent as a `dataset_delta` message, and nothing is sent if nothing changed.
+        """
+        preview = self.build_preview()
+        versions = {var_name: entry["version"] for var_name, entry in preview.items()}
+
+        if full or self.preview_versions is None:
+            self.beaker_kernel.send_response(
+                "iopub", "dataset", preview, parent_header=parent_header
+            )
+        elif versions != self.preview_versions:
+            # Changed previews carry the version they replace so the client can detect a missed delta and resync.
+            delta = {
+                "added": {
+                    var_name: entry for var_name, entry in preview.items()
+                    if var_name not in self.preview_versions
+                },
+                "changed": {
+                    var_name: {**entry, "previous_version": self.preview_versions[var_name]}
+                    for var_name, entry in preview.items()
+                    if var_name in self.preview_versions and self.preview_versions[var_name] != entry["version"]
+                },
+                "removed": [
+                    var_name for var_name in self.preview_versions if var_name not in preview
+                ],
+            }
+            self.beaker_kernel.send_response(
+                "iopub", "dataset_delta", delta, parent_header=parent_header
+            )
+        self.preview_versions = versions
         return data
 
-    async def update_asset_map(self, parent_header={}):
-        code = self.get_code("df_info")
+    @intercept()
+    async def dataset_snapshot_request(self, message):
+        """
+        Resends every dataset preview in full so that a client which missed a delta can resync.
+        """
+        await self.send_df_preview_message(parent_header=message.header, full=True)
+
+    async def update_asset_map(self, parent_header={}, time_budget=None) -> list[str]:
+        """
+        Updates the asset map with the current state of the dataframes in the subkernel. If a `time_budget` in
+        seconds is given, frames that could not be described within it are left as they are, and their names are
+        returned so that they can be retried.
+        """
+        # Frames whose fingerprint matches that of the description the context holds are reported back as unchanged
+        # by the subkernel. The fingerprints are only kept here, so a description computed by a run whose result was
+        # discarded is never mistaken for one the context has.
+        known_fingerprints = {
+            var_name: df_obj["fingerprint"]
+            for var_name, df_obj in self.asset_map.items()
+            if "head" in df_obj and "fingerprint" in df_obj
+        }
+        code = self.get_code(
+            "df_info",
+            {
+                "known_fingerprints": known_fingerprints,
+                "approx_row_threshold": APPROX_STATS_ROW_THRESHOLD,
+                "sample_size": APPROX_STATS_SAMPLE_SIZE,
+                "time_budget": time_budget,
+            }
+        )
         df_info_response = await self.evaluate(
             code,
             parent_header=parent_header,
         )
         df_info = df_info_response.get('return')
+        # Drop frames that no longer exist in the subkernel so that their previews are removed.
+        for var_name in [var_name for var_name in self.asset_map if var_name not in df_info]:
+            del self.asset_map[var_name]
+        deferred = []
         for var_name, info in df_info.items():
+            if info.get("deferred", False):
+                deferred.append(var_name)
+                continue
+            if info.get("unchanged", False):
+                continue
             if var_name in self.asset_map:
                 self.asset_map[var_name].update(info)
             else:
@@ -128,6 +367,15 @@ class DatasetContext(BaseContext):
                     "description": "",
                     **info,
                 }
+        return deferred
+
+    def describe_datasets(self, query: str|None = None) -> dict[str, str|None]:
+        """
+        Returns descriptions of every described dataframe, fitted together within DESCRIPTION_TOKEN_BUDGET tokens and
+        giving the most detail to the frames and columns mentioned in `query`. Frames that didn't fit are given None.
+        """
+        described = {var_name: df_obj for var_name, df_obj in self.asset_map.items() if "head" in df_obj}
+        return self.description_builder.build(described, query=query, budget=DESCRIPTION_TOKEN_BUDGET)
 
     async def auto_context(self):
         intro = f"""
@@ -140,9 +388,12 @@ Please answer any user queries to the best of your ability, but do not guess if
 If you are asked to manipulate or visualize the dataset, use the generate_code tool.
 """
         dataset_blocks = []
-        for var_name, dataset_obj in self.asset_map.items():
-            dataset_info = dataset_obj.get("info", {})
-            dataset_description = await self.describe_dataset(var_name)
+        omitted = []
+        for var_name, dataset_description in self.describe_datasets().items():
+            if dataset_description is None:
+                omitted.append(var_name)
+                continue
+            dataset_info = self.asset_map[var_name].get("info", {})
             dataset_blocks.append(f"""
 Name: {dataset_info.get("name", "User defined dataset")}
 Variable: {var_name}
@@ -153,6 +404,8 @@ The dataset has the following structure:
 {dataset_description}
 --- END ---
 """)
+        if omitted:
+            dataset_blocks.append(f"\nThe following datasets are also available but not described here: {', '.join(omitted)}\n")
         result = "\n".join([intro, *dataset_blocks, outro])
         return result
 
@@ -173,45 +426,287 @@ The dataset has the following structure:
         df_info = self.asset_map.get(var_name, None)
         if not df_info:
             return None
-        output = f"""
-Dataframe head:
-{df_info["head"][:15]}
-
+        output, _ = self.description_builder.describe(var_name, df_info)
+        return output
 
-Columns:
-{df_info["columns"]}
+    @intercept()
+    async def download_dataset_request(self, message):
+        content = message.content
+        var_name = content.get("var_name", "df")
+        fmt = validate_format(content.get("format", None))
+        compression = content.get("compression", None)
+        chunk_size = min(
+            max(int(content.get("chunk_size", DOWNLOAD_CHUNK_SIZE)), MIN_DOWNLOAD_CHUNK_SIZE), MAX_DOWNLOAD_CHUNK_SIZE
+        )
 
+        # Setup is run first for the I/O helpers it defines, which a restarted or restored subkernel may not have.
+        code = "\n".join(
+            [
+                self.get_code("setup"),
+                self.get_code(
+                    "df_download",
+                    {
+                        "var_name": var_name,
+                        "format": fmt,
+                        "compression": compression,
+                    }
+                ),
+            ]
+        )
+        df_response = await self.evaluate(code)
+        spool_info = df_response.get("return")
+        if not spool_info:
+            raise Exception(f"Unable to serialize dataframe '{var_name}' for download.")
+
+        try:
+            await self.stream_file(
+                spool_info["path"],
+                spool_info["size"],
+                chunk_size=chunk_size,
+                metadata={"var_name": var_name, "format": fmt},
+                parent_header=message.header,
+            )
+        finally:
+            os.remove(spool_info["path"])
 
-datatypes:
-{df_info["datatypes"]}
+    async def stream_file(self, path, size, chunk_size=DOWNLOAD_CHUNK_SIZE, metadata=None, parent_header={}):
+        """
+        Sends the contents of a file written by the subkernel to the client as a sequence of bounded-size,
+        base64 encoded chunks, followed by a checksum so that the client can verify the reassembled file.
+        """
+        if metadata is None:
+            metadata = {}
+        chunk_count = max(math.ceil(size / chunk_size), 1)
+        self.beaker_kernel.send_response(
+            "iopub",
+            "download_start",
+            {**metadata, "size": size, "chunk_size": chunk_size, "chunk_count": chunk_count},
+            parent_header=parent_header,
+        )
+        checksum = hashlib.sha256()
+        sent = 0
+        with open(path, "rb") as spool_file:
+            for seq in range(chunk_count):
+                # Read off of the event loop so other kernel messages keep flowing during large downloads.
+                chunk = await asyncio.to_thread(spool_file.read, chunk_size)
+                checksum.update(chunk)
+                sent += len(chunk)
+                self.beaker_kernel.send_response(
+                    "iopub",
+                    "download_chunk",
+                    {**metadata, "seq": seq, "data": b64encode(chunk).decode("ascii")},
+                    parent_header=parent_header,
+                )
+        self.beaker_kernel.send_response(
+            "iopub",
+            "download_complete",
+            {**metadata, "size": sent, "chunk_count": chunk_count, "sha256": checksum.hexdigest()},
+            parent_header=parent_header,
+        )
 
+    @action()
+    async def load_dataset(self, message):
+        """
+        Loads another dataset from HMI-Server into the variable `var_name`, optionally reading only some of its
+        `columns`, the rows matching `row_filter`, at most `nrows` rows, or with explicit `dtypes`.
+        """
+        content = dict(message.content)
+        var_name = content.pop("var_name", "df")
+        self.cancel_profile()
+        await self.add_assets({var_name: content}, parent_header=message.header)
+        await self.send_df_preview_message(parent_header=message.header)
+        return self.asset_map[var_name].get("columns")
+    load_dataset._default_payload = json.dumps(
+        {
+            "var_name": "df",
+            "id": "",
+            "columns": None,
+            "row_filter": [],
+            "nrows": None,
+            "dtypes": None,
+        },
+        indent=2,
+    )
+
+    @action()
+    async def optimize_memory(self, message):
+        """
+        Converts the columns of the dataframes in `var_names` (all tracked dataframes by default) to more compact
+        dtypes: numbers are downcast where no value changes, low-cardinality strings become categoricals and mostly
+        null columns are sparse encoded. Returns the dtype and memory usage in bytes of each column before and after.
+        """
+        content = message.content
+        self.cancel_profile()
+        var_names = content.get("var_names", None) or list(self.asset_map.keys())
+        # Setup is run first for the package checks it defines, which a restarted or restored subkernel may not have.
+        code = "\n".join(
+            [
+                self.get_code("setup"),
+                self.get_code(
+                    "df_optimize_memory",
+                    {
+                        "var_names": var_names,
+                        "category_ratio": content.get("category_ratio", MEMORY_CATEGORY_RATIO),
+                        "sparse_ratio": content.get("sparse_ratio", MEMORY_SPARSE_RATIO),
+                    }
+                ),
+            ]
+        )
+        optimize_response = await self.evaluate(code, parent_header=message.header)
+        report = optimize_response.get("return")
+        if report is None:
+            raise Exception("Unable to optimize the memory usage of the dataframes.")
+        # Picks up the new dtypes, along with the head and statistics of the converted frames.
+        await self.update_asset_map(parent_header=message.header)
+        for var_name, var_report in report.items():
+            if var_name in self.asset_map:
+                self.asset_map[var_name]["memory_usage"] = var_report["bytes_after"]
+        await self.send_df_preview_message(parent_header=message.header)
+        return report
+    optimize_memory._default_payload = json.dumps(
+        {
+            "var_names": None,
+            "category_ratio": MEMORY_CATEGORY_RATIO,
+            "sparse_ratio": MEMORY_SPARSE_RATIO,
+        },
+        indent=2,
+    )
+
+    @staticmethod
+    def checkpoint_path(name: str) -> str:
+        if not re.fullmatch(r"\w[\w.-]*", name):
+            raise ValueError(f"Invalid checkpoint name '{name}'")
+        return os.path.join(CHECKPOINT_DIR, name)
+
+    @action()
+    async def save_checkpoint(self, message):
+        """
+        Saves every tracked dataframe to the named checkpoint as uncompressed Arrow files, along with the asset map,
+        so that the session can later be restored without reloading anything from HMI-Server.
+        """
+        name = message.content.get("name", "default")
+        checkpoint_dir = self.checkpoint_path(name)
+        # Written to a separate directory first so that a failed checkpoint doesn't clobber an earlier one.
+        partial_dir = f"{checkpoint_dir}.partial"
+        await asyncio.to_thread(shutil.rmtree, partial_dir, True)
+        os.makedirs(partial_dir)
+
+        self.cancel_profile()
+        await self.update_asset_map(parent_header=message.header)
+        code = "\n".join(
+            [
+                self.get_code("setup"),
+                self.get_code("df_checkpoint", {"checkpoint_dir": partial_dir, "var_names": list(self.asset_map)}),
+            ]
+        )
+        checkpoint_response = await self.evaluate(code, parent_header=message.header)
+        frames = checkpoint_response.get("return")
+        if frames is None:
+            await asyncio.to_thread(shutil.rmtree, partial_dir, True)
+            raise Exception(f"Unable to checkpoint the dataframes to '{name}'.")
+
+        manifest = {
+            "name": name,
+            "created": datetime.datetime.utcnow().isoformat(),
+            "subkernel": self.subkernel.KERNEL_NAME,
+            "frames": frames,
+            "asset_map": self.asset_map,
+        }
+        with open(os.path.join(partial_dir, CHECKPOINT_MANIFEST), "w") as manifest_file:
+            json.dump(manifest, manifest_file, default=str)
+        await asyncio.to_thread(shutil.rmtree, checkpoint_dir, True)
+        os.replace(partial_dir, checkpoint_dir)
+        return {"name": name, "path": checkpoint_dir, "frames": frames}
+    save_checkpoint._default_payload = '{\n\t"name": "default"\n}'
+
+    @action()
+    async def restore_checkpoint(self, message):
+        """
+        Restores the dataframes and asset map saved to the named checkpoint. The Arrow files are memory mapped rather
+        than read, and nothing is fetched from HMI-Server.
+        """
+        name = message.content.get("name", "default")
+        checkpoint_dir = self.checkpoint_path(name)
+        try:
+            with open(os.path.join(checkpoint_dir, CHECKPOINT_MANIFEST)) as manifest_file:
+                manifest = json.load(manifest_file)
+        except FileNotFoundError:
+            raise Exception(f"Checkpoint '{name}' not found.")
+        if manifest["subkernel"] != self.subkernel.KERNEL_NAME:
+            raise Exception(
+                f"Checkpoint '{name}' was saved from a {manifest['subkernel']} subkernel and can't be restored into "
+                f"a {self.subkernel.KERNEL_NAME} subkernel."
+            )
 
-Statistics:
-{df_info["statistics"]}
-"""
-        return output
+        self.cancel_profile()
+        command = "\n".join(
+            [
+                self.get_code("setup"),
+                self.get_code("df_restore", {"checkpoint_dir": checkpoint_dir, "frames": manifest["frames"]}),
+            ]
+        )
+        await self.execute(command)
+        self.asset_map = manifest["asset_map"]
+        await self.send_df_preview_message(parent_header=message.header, full=True)
+        return {"name": name, "created": manifest["created"], "frames": list(manifest["frames"])}
+    restore_checkpoint._default_payload = '{\n\t"name": "default"\n}'
 
     @intercept()
-    async def download_dataset_request(self, message):
+    async def dataset_page_request(self, message):
+        """
+        Returns a window of rows and columns of a dataframe, optionally filtered and sorted, so that clients can
+        page through large frames without the whole frame being sent.
+        """
         content = message.content
         var_name = content.get("var_name", "df")
-        # TODO: Collect any options that might be needed, if they ever are
-
-        # TODO: This doesn't work very well. Is very slow to encode, and transfer all of the required messages multiple times proxies through the proxy kernel.
-        # We should find a better way to accomplish this if it's needed.
-        code = self.get_code("df_download", {"var_name": var_name})
-        df_response = await self.evaluate(code)
-        df_contents = df_response.get("stdout_list")
+        page_spec = {
+            "row_offset": max(int(content.get("row_offset", 0)), 0),
+            "row_limit": min(max(int(content.get("row_limit", PAGE_ROW_LIMIT)), 0), MAX_PAGE_ROW_LIMIT),
+            "column_offset": max(int(content.get("column_offset", 0)), 0),
+            "column_limit": min(max(int(content.get("column_limit", PAGE_COLUMN_LIMIT)), 0), MAX_PAGE_COLUMN_LIMIT),
+            "sort": content.get("sort", None),
+            "filters": content.get("filters", []),
+        }
+        code = self.get_code("df_page", {"var_name": var_name, "page_spec": page_spec})
+        page_response = await self.evaluate(code, parent_header=message.header)
+        page = page_response.get("return")
+        if page is None:
+            raise Exception(f"Unable to read page of dataframe '{var_name}'.")
         self.beaker_kernel.send_response(
             "iopub",
-            "download_response",
+            "dataset_page_response",
+            {"var_name": var_name, **page},
+            parent_header=message.header,
+        )
+
+    async def dataset_lineage(self, var_name: str, parent_dataset: dict, parent_header={}) -> dict|None:
+        """
+        Returns the column schema of the dataframe `var_name` and a summary of how it differs from the dataset file
+        it was loaded from, or None if the subkernel can't produce them. Column annotations carried by the parent
+        dataset are kept for the columns that still exist.
+        """
+        if not isinstance(self.subkernel, PythonSubkernel):
+            return None
+        df_obj = self.asset_map.get(var_name, {})
+        baseline = df_obj.get("source", None)
+        if baseline is not None and not os.path.exists(baseline["path"]):
+            baseline = None
+        code = self.get_code("df_diff", {"var_name": var_name, "baseline": baseline})
+        diff_response = await self.evaluate(code, parent_header=parent_header)
+        lineage = diff_response.get("return")
+        if lineage is None:
+            return None
+
+        parent_columns = {column.get("name"): column for column in parent_dataset.get("columns") or []}
+        lineage["columns"] = [
             {
-                "data": [
-                    codecs.encode(line.encode(), "base64").decode()
-                    for line in df_contents
-                ]
-            },
-        )  # , parent_header=parent_header)
+                **parent_columns.get(column["name"], {}),
+                **column,
+                "metadata": {**(parent_columns.get(column["name"], {}).get("metadata") or {}), **column["metadata"]},
+            }
+            for column in lineage["columns"]
+        ]
+        return lineage
 
     @intercept()
     async def save_dataset_request(self, message):
@@ -221,23 +716,44 @@ Statistics:
         new_name = content.get("name")
         filename = content.get("filename", None)
         var_name = content.get("var_name", "df")
+        fmt = content.get("format", None)
+        compression = content.get("compression", None)
         dataservice_url = os.environ["HMI_SERVER_URL"]
 
+        if fmt is None:
+            fmt = format_from_filename(filename) or DEFAULT_FORMAT
+        fmt = validate_format(fmt)
         if filename is None:
             filename = "dataset.csv"
+        filename = filename_for_format(filename, fmt)
 
         parent_url = f"{dataservice_url}/datasets/{parent_dataset_id}"
         parent_dataset = requests.get(parent_url, auth=self.auth.requests_auth()).json()
         if not parent_dataset:
             raise Exception(f"Unable to locate parent dataset '{parent_dataset_id}'")
 
+        transformed_at = datetime.datetime.utcnow()
         new_dataset = copy.deepcopy(parent_dataset)
         del new_dataset["id"]
         new_dataset["name"] = new_name
-        new_dataset["description"] += f"\\nTransformed from dataset '{parent_dataset['name']}' ({parent_dataset['id']}) at {datetime.datetime.utcnow().strftime('%c %Z')}"
+        new_dataset["description"] += f"\\nTransformed from dataset '{parent_dataset['name']}' ({parent_dataset['id']}) at {transformed_at.strftime('%c %Z')}"
         new_dataset["fileNames"] = [filename]
-        #clear the columns field on the new dataset as there was likely a change to either the columns or the data. HMI-Server will deal with regenerating this.
-        new_dataset["columns"] = []
+
+        lineage = await self.dataset_lineage(var_name, parent_dataset, parent_header=message.header)
+        if lineage is None:
+            #clear the columns field on the new dataset as there was likely a change to either the columns or the data. HMI-Server will deal with regenerating this.
+            new_dataset["columns"] = []
+        else:
+            new_dataset["columns"] = lineage["columns"]
+            new_dataset["metadata"] = {
+                **(parent_dataset.get("metadata") or {}),
+                "lineage": {
+                    "parent_dataset_id": parent_dataset_id,
+                    "source_dataset_id": self.asset_map.get(var_name, {}).get("id"),
+                    "transformed_at": transformed_at.isoformat(),
+                    "diff": lineage["diff"],
+                },
+            }
 
         import pprint
         logger.error(f"new dataset: {pprint.pformat(new_dataset)}")
@@ -250,12 +766,20 @@ Statistics:
         data_url_req = requests.get(f"{new_dataset_url}/upload-url?filename={filename}", auth=self.auth.requests_auth())
         data_url = data_url_req.json().get('url', None)
 
-        code = self.get_code(
-            "df_save_as",
-            {
-                "var_name": var_name,
-                "data_url": data_url,
-            }
+        code = "\n".join(
+            [
+                self.get_code("setup"),
+                self.get_code(
+                    "df_save_as",
+                    {
+                        "var_name": var_name,
+                        "data_url": data_url,
+                        "format": fmt,
+                        "compression": compression,
+                        "max_retries": UPLOAD_MAX_RETRIES,
+                    }
+                ),
+            ]
         )
         df_response = await self.execute(code)
 
@@ -266,6 +790,8 @@ Statistics:
                 {
                     "dataset_id": new_dataset_id,
                     "filename": filename,
+                    "format": fmt,
                     "parent_dataset_id": parent_dataset_id,
+                    "diff": new_dataset.get("metadata", {}).get("lineage", {}).get("diff"),
                 },
             )
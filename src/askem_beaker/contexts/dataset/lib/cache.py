@@ -0,0 +1,184 @@
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "askem_beaker", "datasets")
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class DatasetCache:
+    """
+    On-disk cache of dataset files downloaded from HMI-Server, shared by every kernel on the host.
+
+    Entries are keyed by asset id, filename and the asset's server-side version, and are revalidated against the
+    stored ETag with a conditional request before being reused. Files are written to a temporary name and renamed
+    into place so that readers never see a partial file. Once the cache grows past `max_bytes`, the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, root: str = None, max_bytes: int = None) -> None:
+        self.root = root or os.environ.get("DATASET_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.environ.get("DATASET_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+        )
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def cache_key(asset_id: str, filename: str, version: str|None = None) -> str:
+        return hashlib.sha256(f"{asset_id}\0{filename}\0{version or ''}".encode()).hexdigest()
+
+    def data_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.data")
+
+    def meta_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.meta.json")
+
+    @contextlib.contextmanager
+    def lock(self, name: str):
+        with open(os.path.join(self.root, f"{name}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def manifest_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.dtypes.json")
+
+    def read_meta(self, key: str) -> dict|None:
+        try:
+            with open(self.meta_path(key)) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self.data_path(key)):
+            return None
+        return meta
+
+    def write_json(self, key: str, path: str, data: dict):
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=f".{key}.", suffix=".json")
+        with os.fdopen(fd, "w") as json_file:
+            json.dump(data, json_file)
+        os.replace(temp_path, path)
+
+    def write_meta(self, key: str, meta: dict):
+        self.write_json(key, self.meta_path(key), meta)
+
+    def read_manifest(self, key: str, language: str) -> dict:
+        """
+        Returns the column dtypes previously recorded for the cached file when loaded in `language`, or an empty dict
+        if none were recorded.
+        """
+        try:
+            with open(self.manifest_path(key)) as manifest_file:
+                return json.load(manifest_file).get(language, {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def write_manifest(self, key: str, language: str, dtypes: dict):
+        """
+        Records the column dtypes observed when the cached file was loaded in `language`, merged with any already
+        recorded, so that later loads of the same file can skip type inference. Each subkernel language has its own
+        names for types, so they are recorded separately.
+        """
+        with self.lock(key):
+            try:
+                with open(self.manifest_path(key)) as manifest_file:
+                    manifest = json.load(manifest_file)
+            except (OSError, ValueError):
+                manifest = {}
+            manifest[language] = {**manifest.get(language, {}), **dtypes}
+            self.write_json(key, self.manifest_path(key), manifest)
+
+    def touch(self, key: str):
+        # The modification time of the metadata file records when the entry was last used.
+        with contextlib.suppress(OSError):
+            os.utime(self.meta_path(key))
+
+    async def fetch(
+        self, client: httpx.AsyncClient, url: str, asset_id: str, filename: str, version: str|None = None
+    ) -> str:
+        """
+        Returns the path of a local copy of the file at `url`, downloading it only if there is no cached copy or
+        the cached copy is stale.
+        """
+        key = self.cache_key(asset_id, filename, version)
+        meta = self.read_meta(key)
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        elif meta and version:
+            # Without an ETag to revalidate against, the server-side version in the key is trusted.
+            self.touch(key)
+            return self.data_path(key)
+
+        # The presigned url carries its own credentials, so HMI auth must not be sent along with it.
+        async with client.stream("GET", url, headers=headers, auth=None) as response:
+            if response.status_code == 304 and meta:
+                logger.info(f"Using cached copy of '{filename}' for asset '{asset_id}'.")
+                self.touch(key)
+                return self.data_path(key)
+            response.raise_for_status()
+
+            fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=f".{key}.", suffix=".part")
+            try:
+                size = 0
+                with os.fdopen(fd, "wb") as temp_file:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        await asyncio.to_thread(temp_file.write, chunk)
+                        size += len(chunk)
+                    await asyncio.to_thread(os.fsync, temp_file.fileno())
+                with self.lock(key):
+                    os.replace(temp_path, self.data_path(key))
+                    self.write_meta(
+                        key,
+                        {
+                            "asset_id": asset_id,
+                            "filename": filename,
+                            "version": version,
+                            "etag": response.headers.get("ETag"),
+                            "size": size,
+                        }
+                    )
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+                raise
+        return self.data_path(key)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits within `max_bytes`.
+        """
+        with self.lock("evict"):
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith(".meta.json"):
+                    continue
+                key = name[:-len(".meta.json")]
+                try:
+                    last_used = os.path.getmtime(self.meta_path(key))
+                    size = os.path.getsize(self.data_path(key))
+                except OSError:
+                    continue
+                entries.append((last_used, size, key))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                with self.lock(key):
+                    for path in (self.data_path(key), self.meta_path(key), self.manifest_path(key)):
+                        with contextlib.suppress(OSError):
+                            os.remove(path)
+                total -= size
@@ -0,0 +1,196 @@
+"""
+Token-budgeted descriptions of the dataframes in the dataset context, for inclusion in LLM prompts.
+"""
+import hashlib
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = 6000
+# Tokens allowed for the text the prompt wraps around each description.
+FRAME_OVERHEAD_TOKENS = 60
+DEFAULT_ENCODING = "cl100k_base"
+# Used to estimate token counts if the tokenizer's encoding can't be loaded.
+CHARACTERS_PER_TOKEN = 4
+
+# From most to least detailed: rows of the head shown, columns shown and lines of statistics kept at each level.
+DETAIL_LEVELS = {
+    "full": {"head_rows": 15, "max_columns": None, "statistics_lines": None},
+    "reduced": {"head_rows": 5, "max_columns": 30, "statistics_lines": 20},
+    "minimal": {"head_rows": 0, "max_columns": 50, "statistics_lines": 0},
+}
+
+
+class DescriptionBuilder:
+    """
+    Builds descriptions of dataframes from their entries in the asset map, fitting the descriptions of all frames
+    into a token budget.
+
+    Each frame is described at the most detailed level that fits, with frames mentioned in the query given detail
+    first and, when a frame's columns are cut down, the columns mentioned in the query kept. Descriptions are cached by
+    a fingerprint of the frame's entry, so frames that haven't changed are not described and tokenized again.
+    """
+
+    def __init__(self, encoding_name: str = DEFAULT_ENCODING) -> None:
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self.cache = {}
+
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as err:
+                # Loading an encoding may need to download it, so estimate from the length rather than fail.
+                logger.warning(f"Unable to load tokenizer encoding '{self.encoding_name}', estimating token counts: {err}")
+                self._encoding = False
+        return self._encoding
+
+    def count_tokens(self, text: str) -> int:
+        if self.encoding:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return len(text) // CHARACTERS_PER_TOKEN + 1
+
+    @staticmethod
+    def fingerprint(df_info: dict) -> str:
+        return hashlib.sha1(
+            json.dumps(
+                [df_info.get(field) for field in ("columns", "datatypes", "head", "statistics", "approximate_statistics")],
+                default=str,
+            ).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def mentioned_columns(df_info: dict, query: str|None) -> tuple:
+        if not query:
+            return ()
+        return tuple(
+            str(column) for column in df_info.get("columns") or []
+            if re.search(rf"(?<!\w){re.escape(str(column))}(?!\w)", query, re.IGNORECASE)
+        )
+
+    def describe(self, var_name: str, df_info: dict, level: str = "full", focus_columns: tuple = ()) -> tuple[str, int]:
+        """
+        Returns the description of a frame at the given level of detail along with its length in tokens.
+        """
+        key = (self.fingerprint(df_info), level, focus_columns)
+        cached = self.cache.get(var_name, {})
+        if key not in cached:
+            if cached and next(iter(cached))[0] != key[0]:
+                cached = {}
+            text = render_description(df_info, level, focus_columns)
+            cached[key] = (text, self.count_tokens(text))
+            self.cache[var_name] = cached
+        return cached[key]
+
+    def build(self, asset_map: dict, query: str|None = None, budget: int = DEFAULT_TOKEN_BUDGET) -> dict[str, str|None]:
+        """
+        Returns a description of every frame in `asset_map`, fitted together within `budget` tokens. Frames that don't
+        fit even at the least detailed level are given None.
+        """
+        for var_name in list(self.cache):
+            if var_name not in asset_map:
+                del self.cache[var_name]
+
+        focus = {var_name: self.mentioned_columns(df_info, query) for var_name, df_info in asset_map.items()}
+        mentioned = {
+            var_name for var_name in asset_map
+            if query and re.search(rf"(?<!\w){re.escape(var_name)}(?!\w)", query)
+        }
+        # Frames named in the query come first, then those with columns named in it, then the rest in order.
+        order = sorted(asset_map, key=lambda var_name: (var_name not in mentioned, not focus[var_name]))
+
+        def tokens(var_name, level):
+            return self.describe(var_name, asset_map[var_name], level, focus[var_name])[1]
+
+        levels = {}
+        used = 0
+        for var_name in order:
+            cost = tokens(var_name, "minimal") + FRAME_OVERHEAD_TOKENS
+            if used + cost > budget:
+                continue
+            levels[var_name] = "minimal"
+            used += cost
+        for level in ("reduced", "full"):
+            for var_name in levels:
+                extra = tokens(var_name, level) - tokens(var_name, levels[var_name])
+                if used + extra <= budget:
+                    levels[var_name] = level
+                    used += extra
+
+        return {
+            var_name: (
+                self.describe(var_name, asset_map[var_name], levels[var_name], focus[var_name])[0]
+                if var_name in levels else None
+            )
+            for var_name in asset_map
+        }
+
+
+def select_columns(columns: list, max_columns: int|None, focus_columns: tuple = ()) -> list[int]:
+    """
+    Returns the positions of at most `max_columns` columns to show, keeping the focus columns and otherwise the
+    leftmost columns, in their original order.
+    """
+    if max_columns is None or len(columns) <= max_columns:
+        return list(range(len(columns)))
+    focused = [position for position, column in enumerate(columns) if str(column) in focus_columns][:max_columns]
+    rest = [position for position in range(len(columns)) if position not in focused]
+    return sorted(focused + rest[:max_columns - len(focused)])
+
+
+def render_description(df_info: dict, level: str = "full", focus_columns: tuple = ()) -> str:
+    detail = DETAIL_LEVELS[level]
+    if level == "full":
+        if df_info.get("approximate_statistics", False):
+            statistics_label = (
+                f"Statistics (approximate, quantiles estimated from a sample of {df_info.get('statistics_sample_size')} rows "
+                "and distinct counts estimated with a sketch)"
+            )
+        else:
+            statistics_label = "Statistics"
+        return f"""
+Dataframe head:
+{df_info["head"][:detail["head_rows"]]}
+
+
+Columns:
+{df_info["columns"]}
+
+
+datatypes:
+{df_info["datatypes"]}
+
+
+{statistics_label}:
+{df_info["statistics"]}
+"""
+
+    columns = df_info.get("columns") or []
+    positions = select_columns(columns, detail["max_columns"], focus_columns)
+    omitted = len(columns) - len(positions)
+    shown = [columns[position] for position in positions]
+    sections = []
+    if detail["head_rows"]:
+        head = [
+            [row[position] for position in positions if position < len(row)]
+            for row in (df_info.get("head") or [])[:detail["head_rows"]]
+        ]
+        sections.append(f"Dataframe head (selected columns):\n{head}")
+    column_note = f" ({omitted} more columns not shown)" if omitted else ""
+    dtypes = df_info.get("dtypes")
+    if dtypes:
+        sections.append(f"Columns and datatypes{column_note}:\n{ {str(column): dtypes.get(str(column)) for column in shown} }")
+    else:
+        sections.append(f"Columns{column_note}:\n{shown}")
+    if detail["statistics_lines"]:
+        statistics_lines = str(df_info.get("statistics", "")).splitlines()
+        statistics = "\n".join(statistics_lines[:detail["statistics_lines"]])
+        if len(statistics_lines) > detail["statistics_lines"]:
+            statistics += "\n(statistics truncated)"
+        sections.append(f"Statistics:\n{statistics}")
+    return "\n" + "\n\n\n".join(sections) + "\n"
@@ -0,0 +1,125 @@
+"""
+Row and column level comparison of dataframes, used to record how a saved dataset differs from the dataset it was
+derived from.
+
+This module is imported from within the subkernel by the dataset procedures, so it must only depend on pandas and
+numpy.
+"""
+import numpy as np
+import pandas as pd
+
+# HMI-Server column data types, by the kind of the pandas dtype.
+HMI_DATA_TYPES = {
+    "b": "BOOLEAN",
+    "i": "INT",
+    "u": "INT",
+    "f": "FLOAT",
+    "M": "DATETIME",
+    "m": "TIME",
+}
+
+
+def hmi_data_type(dtype) -> str:
+    if isinstance(dtype, pd.SparseDtype):
+        dtype = dtype.subtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    kind = getattr(dtype, "kind", None)
+    if kind in HMI_DATA_TYPES:
+        return HMI_DATA_TYPES[kind]
+    if kind == "O" or pd.api.types.is_string_dtype(dtype):
+        return "STRING"
+    return "UNKNOWN"
+
+
+def column_schema(df: pd.DataFrame) -> list[dict]:
+    """
+    Returns the columns of `df` in the form HMI-Server describes dataset columns.
+    """
+    return [
+        {
+            "name": str(column),
+            "dataType": hmi_data_type(dtype),
+            "metadata": {"dtype": str(dtype)},
+        }
+        for column, dtype in df.dtypes.items()
+    ]
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    if len(df.columns) == 0:
+        return np.zeros(len(df), dtype=np.uint64)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+
+
+def diff_frames(original: pd.DataFrame, current: pd.DataFrame) -> dict:
+    """
+    Summarizes the columns added, dropped and retyped and the rows added, removed and modified in `current` relative
+    to `original`.
+
+    Rows are compared by hashing each row of the columns the two frames share with the same dtype. When both frames
+    have a unique index, rows are matched by index label, so a changed value counts as a modified row; otherwise rows
+    are matched by their hashes alone, and a modified row counts as one removed and one added.
+    """
+    original_columns = [str(column) for column in original.columns]
+    current_columns = [str(column) for column in current.columns]
+    original_dtypes = {str(column): str(dtype) for column, dtype in original.dtypes.items()}
+    current_dtypes = {str(column): str(dtype) for column, dtype in current.dtypes.items()}
+
+    common = [column for column in current_columns if column in original_dtypes]
+    retyped = [column for column in common if original_dtypes[column] != current_dtypes[column]]
+    compared = [column for column in common if column not in retyped]
+    summary = {
+        "original_shape": list(original.shape),
+        "current_shape": list(current.shape),
+        "columns_added": [column for column in current_columns if column not in original_dtypes],
+        "columns_dropped": [column for column in original_columns if column not in current_dtypes],
+        "columns_retyped": [
+            {"name": column, "from": original_dtypes[column], "to": current_dtypes[column]} for column in retyped
+        ],
+    }
+
+    # Columns are selected by position so that frames with non-string column labels compare the same way.
+    original_compared = original.iloc[:, [original_columns.index(column) for column in compared]]
+    current_compared = current.iloc[:, [current_columns.index(column) for column in compared]]
+    original_hashes = row_hashes(original_compared)
+    current_hashes = row_hashes(current_compared)
+
+    if original.index.is_unique and current.index.is_unique:
+        in_original = current.index.isin(original.index)
+        matched = current.index[in_original]
+        original_positions = original.index.get_indexer(matched)
+        current_positions = np.flatnonzero(in_original)
+        modified = original_hashes[original_positions] != current_hashes[current_positions]
+        # Only the modified rows need their columns compared individually.
+        modified_columns = [
+            column
+            for position, column in enumerate(compared)
+            if modified.any() and not np.array_equal(
+                pd.util.hash_array(original_compared.iloc[original_positions[modified], position].to_numpy()),
+                pd.util.hash_array(current_compared.iloc[current_positions[modified], position].to_numpy()),
+            )
+        ]
+        summary.update(
+            {
+                "rows_matched_by": "index",
+                "rows_added": int(len(current) - len(matched)),
+                "rows_removed": int(len(original) - len(matched)),
+                "rows_modified": int(modified.sum()),
+                "columns_modified": modified_columns,
+            }
+        )
+    else:
+        original_counts = pd.Series(original_hashes).value_counts()
+        current_counts = pd.Series(current_hashes).value_counts()
+        difference = current_counts.subtract(original_counts, fill_value=0)
+        summary.update(
+            {
+                "rows_matched_by": "content",
+                "rows_added": int(difference[difference > 0].sum()),
+                "rows_removed": int(-difference[difference < 0].sum()),
+                "rows_modified": None,
+                "columns_modified": None,
+            }
+        )
+    return summary
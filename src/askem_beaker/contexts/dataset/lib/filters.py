@@ -0,0 +1,51 @@
+"""
+Language independent row filters, given as a list of `{"column": ..., "op": ..., "value": ...}` conditions that must
+all hold.
+
+This module is imported from within the subkernel by the dataset procedures, so it must only depend on pandas, numpy
+and pyarrow.
+"""
+import operator
+
+import numpy as np
+import pandas as pd
+
+FILTER_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "contains": lambda series, value: series.astype(str).str.contains(str(value), regex=False),
+}
+
+
+def filter_mask(df: pd.DataFrame, filters: list[dict]|None) -> np.ndarray:
+    """
+    Returns a boolean mask of the rows of `df` matching every condition in `filters`. Missing values never match.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for row_filter in filters or []:
+        matches = FILTER_OPERATORS[row_filter["op"]](df[row_filter["column"]], row_filter["value"])
+        mask &= matches.fillna(False).to_numpy(dtype=bool)
+    return mask
+
+
+def arrow_filter_expression(filters: list[dict]|None):
+    """
+    Converts `filters` to a pyarrow dataset expression so that they can be pushed down into Parquet and Arrow
+    readers. Returns None when there are no conditions.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    expression = None
+    for row_filter in filters or []:
+        field = ds.field(row_filter["column"])
+        if row_filter["op"] == "contains":
+            condition = pc.match_substring(field.cast("string"), str(row_filter["value"]))
+        else:
+            condition = FILTER_OPERATORS[row_filter["op"]](field, row_filter["value"])
+        expression = condition if expression is None else expression & condition
+    return expression
@@ -0,0 +1,68 @@
+import os
+
+# Supported on-disk representations of a dataset. CSV remains the default for anything unrecognized.
+DATASET_FORMATS = {
+    "csv": {
+        "extensions": (".csv", ".tsv", ".txt"),
+        "magic": None,
+    },
+    "parquet": {
+        "extensions": (".parquet", ".pq"),
+        "magic": b"PAR1",
+    },
+    "arrow": {
+        "extensions": (".arrow", ".feather", ".ipc"),
+        "magic": b"ARROW1",
+    },
+}
+DEFAULT_FORMAT = "csv"
+DEFAULT_COMPRESSION = "snappy"
+
+# Number of leading bytes needed to identify a file by its content.
+MAGIC_BYTES_LENGTH = max(len(fmt["magic"]) for fmt in DATASET_FORMATS.values() if fmt["magic"])
+
+
+def format_from_filename(filename: str|None) -> str|None:
+    if not filename:
+        return None
+    _, ext = os.path.splitext(filename.lower())
+    for fmt, spec in DATASET_FORMATS.items():
+        if ext in spec["extensions"]:
+            return fmt
+    return None
+
+
+def format_from_content(head: bytes|None) -> str|None:
+    if not head:
+        return None
+    for fmt, spec in DATASET_FORMATS.items():
+        if spec["magic"] and head.startswith(spec["magic"]):
+            return fmt
+    return None
+
+
+def detect_format(filename: str|None, head: bytes|None = None) -> str:
+    """
+    Works out the format of a dataset file, preferring the file extension and falling back to sniffing the
+    leading bytes of the file.
+    """
+    return format_from_filename(filename) or format_from_content(head) or DEFAULT_FORMAT
+
+
+def validate_format(fmt: str|None) -> str:
+    if fmt is None:
+        return DEFAULT_FORMAT
+    fmt = fmt.lower()
+    if fmt not in DATASET_FORMATS:
+        raise ValueError(f"Unsupported dataset format '{fmt}'. Expected one of: {', '.join(DATASET_FORMATS)}")
+    return fmt
+
+
+def filename_for_format(filename: str, fmt: str) -> str:
+    """
+    Returns `filename` with its extension swapped to match `fmt`, if it doesn't already match.
+    """
+    if format_from_filename(filename) == fmt:
+        return filename
+    base, _ = os.path.splitext(filename)
+    return f"{base}{DATASET_FORMATS[fmt]['extensions'][0]}"
@@ -0,0 +1,100 @@
+"""
+Readers used by the dataset procedures to load dataset files into pandas, pushing column projection, row filters and
+row limits down into the reader so that unneeded data is never loaded.
+
+This module is imported from within the subkernel by the dataset procedures, so it must only depend on pandas, numpy
+and pyarrow.
+"""
+import pandas as pd
+
+from askem_beaker.contexts.dataset.lib.filters import arrow_filter_expression, filter_mask
+
+# Number of rows parsed at a time when filtering a CSV file while it is read.
+CSV_CHUNK_SIZE = 250_000
+
+
+def csv_type_arguments(dtypes, columns=None):
+    """
+    Splits `dtypes` into the `dtype` and `parse_dates` arguments of `pd.read_csv`, as datetime columns can only be
+    parsed through the latter.
+    """
+    if not dtypes:
+        return {"dtype": None}
+    if columns is not None:
+        dtypes = {column: dtype for column, dtype in dtypes.items() if column in columns}
+    parse_dates = [column for column, dtype in dtypes.items() if str(dtype).startswith("datetime64")]
+    return {
+        "dtype": {column: dtype for column, dtype in dtypes.items() if column not in parse_dates} or None,
+        "parse_dates": parse_dates or False,
+    }
+
+
+def read_csv(
+    path, columns=None, row_filter=None, nrows=None, dtypes=None, dtype_hints=None, chunksize=CSV_CHUNK_SIZE
+):
+    if dtype_hints:
+        # Hints are dtypes recorded from an earlier load of the same file. Should the file no longer match them, it
+        # is read again with types inferred.
+        try:
+            return read_csv(
+                path,
+                columns=columns,
+                row_filter=row_filter,
+                nrows=nrows,
+                dtypes={**dtype_hints, **(dtypes or {})},
+                chunksize=chunksize,
+            )
+        except (ValueError, TypeError, OverflowError):
+            pass
+
+    if not row_filter:
+        return pd.read_csv(path, nrows=nrows, usecols=columns, **csv_type_arguments(dtypes, columns))
+
+    # The columns the filter tests are read too, and dropped once the rows have been filtered.
+    filter_columns = []
+    if columns is not None:
+        filter_columns = [
+            column for column in dict.fromkeys(condition["column"] for condition in row_filter) if column not in columns
+        ]
+    read_columns = None if columns is None else [*columns, *filter_columns]
+    read_args = {"usecols": read_columns, **csv_type_arguments(dtypes, read_columns)}
+
+    # Filter each chunk as it is parsed so that rows which don't match are never held in memory together.
+    chunks = []
+    matched = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize, **read_args):
+        chunk = chunk[filter_mask(chunk, row_filter)].drop(columns=filter_columns)
+        if nrows is not None:
+            chunk = chunk.iloc[:nrows - matched]
+        chunks.append(chunk)
+        matched += len(chunk)
+        if nrows is not None and matched >= nrows:
+            break
+    if not chunks:
+        return pd.read_csv(path, nrows=0, **read_args).drop(columns=filter_columns)
+    return pd.concat(chunks, ignore_index=True)
+
+def read_columnar(path, fmt, columns=None, row_filter=None, nrows=None, dtypes=None):
+    import pyarrow.dataset as ds
+
+    # Column selection and filters are pushed down into the Parquet/IPC reader, skipping unneeded columns and, for
+    # Parquet, row groups whose statistics rule them out.
+    dataset = ds.dataset(path, format="parquet" if fmt == "parquet" else "ipc")
+    scan_args = {"columns": columns, "filter": arrow_filter_expression(row_filter)}
+    if nrows is not None:
+        table = dataset.head(nrows, **scan_args)
+    else:
+        table = dataset.to_table(**scan_args)
+    df = table.to_pandas()
+    if dtypes:
+        df = df.astype(dtypes, copy=False)
+    return df
+
+
+def read_dataset(path, fmt="csv", columns=None, row_filter=None, nrows=None, dtypes=None, dtype_hints=None):
+    if fmt in ("parquet", "arrow"):
+        # Columnar formats store their types, so there is nothing for hints to save.
+        return read_columnar(path, fmt, columns=columns, row_filter=row_filter, nrows=nrows, dtypes=dtypes)
+    return read_csv(
+        path, columns=columns, row_filter=row_filter, nrows=nrows, dtypes=dtypes, dtype_hints=dtype_hints
+    )
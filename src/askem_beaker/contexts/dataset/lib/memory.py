@@ -0,0 +1,79 @@
+"""
+Memory optimization of dataframes, replacing pandas' default inferred dtypes with more compact representations.
+
+This module is imported from within the subkernel by the dataset procedures, so it must only depend on pandas and
+numpy.
+"""
+import numpy as np
+import pandas as pd
+
+# String columns with at most this ratio of distinct values to rows are converted to categoricals.
+CATEGORY_RATIO = 0.5
+# Columns with at least this ratio of null values to rows are sparse encoded.
+SPARSE_RATIO = 0.9
+
+
+def optimize_column(series: pd.Series, category_ratio: float = CATEGORY_RATIO, sparse_ratio: float = SPARSE_RATIO):
+    """
+    Returns `series` converted to the most compact dtype that represents all of its values exactly.
+    """
+    if len(series) == 0 or isinstance(series.dtype, (pd.SparseDtype, pd.CategoricalDtype)):
+        return series
+
+    null_count = int(series.isna().sum())
+    if null_count / len(series) >= sparse_ratio and (
+        pd.api.types.is_numeric_dtype(series.dtype) or series.dtype == object
+    ):
+        # Mostly null columns only store their non-null values.
+        return series.astype(pd.SparseDtype(series.dtype, np.nan))
+
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    if pd.api.types.is_integer_dtype(series.dtype):
+        downcast = "unsigned" if series.min() >= 0 else "integer"
+        return pd.to_numeric(series, downcast=downcast)
+    if pd.api.types.is_float_dtype(series.dtype):
+        # Only narrowed when no value loses precision, as float32 is otherwise not an exact representation.
+        narrowed = series.astype(np.float32)
+        if np.array_equal(narrowed.to_numpy(dtype=np.float64), series.to_numpy(dtype=np.float64), equal_nan=True):
+            return narrowed
+        return series
+    if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        distinct = series.nunique(dropna=True)
+        if distinct / len(series) <= category_ratio and pd.api.types.infer_dtype(series, skipna=True) == "string":
+            return series.astype("category")
+    return series
+
+
+def optimize_frame(df: pd.DataFrame, category_ratio: float = CATEGORY_RATIO, sparse_ratio: float = SPARSE_RATIO):
+    """
+    Returns a copy of `df` with every column converted by `optimize_column`, along with a report of the dtype and
+    memory usage in bytes of each column before and after.
+    """
+    bytes_before = df.memory_usage(index=False, deep=True)
+    optimized = pd.DataFrame(
+        {
+            column: optimize_column(df[column], category_ratio=category_ratio, sparse_ratio=sparse_ratio)
+            for column in df.columns
+        },
+        index=df.index,
+    )
+    optimized.columns = df.columns
+    bytes_after = optimized.memory_usage(index=False, deep=True)
+
+    columns = [
+        {
+            "column": str(column),
+            "dtype_before": str(df.dtypes.iloc[position]),
+            "dtype_after": str(optimized.dtypes.iloc[position]),
+            "bytes_before": int(bytes_before.iloc[position]),
+            "bytes_after": int(bytes_after.iloc[position]),
+        }
+        for position, column in enumerate(df.columns)
+    ]
+    report = {
+        "columns": columns,
+        "bytes_before": int(bytes_before.sum()),
+        "bytes_after": int(bytes_after.sum()),
+    }
+    return optimized, report
@@ -0,0 +1,94 @@
+"""
+Bounded-time summary statistics for dataframes.
+
+This module is imported from within the subkernel by the dataset procedures, so it must only depend on pandas and
+numpy.
+"""
+import numpy as np
+import pandas as pd
+
+# Frames with more rows than this are summarized approximately instead of with a full `describe()`.
+APPROX_ROW_THRESHOLD = 1_000_000
+SAMPLE_SIZE = 100_000
+# Number of index bits used by the HyperLogLog distinct count sketch (2**12 registers, ~1.6% standard error).
+HLL_PRECISION = 12
+
+
+def hll_distinct_count(values: pd.Series, precision: int = HLL_PRECISION) -> int:
+    """
+    Estimates the number of distinct non-null values in `values` using a HyperLogLog sketch.
+    """
+    values = values.dropna()
+    if values.empty:
+        return 0
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+    num_registers = 1 << precision
+    value_bits = 64 - precision
+    indices = (hashes >> np.uint64(value_bits)).astype(np.int64)
+    remainders = hashes & np.uint64((1 << value_bits) - 1)
+    # Rank is the position of the leftmost set bit within the remaining bits, counting from 1.
+    _, bit_lengths = np.frexp(remainders.astype(np.float64))
+    ranks = (value_bits - bit_lengths + 1).astype(np.int64)
+    # A grouped max rather than np.maximum.at, whose unbuffered loop takes seconds per column on large frames.
+    register_maxima = pd.Series(ranks).groupby(indices).max()
+    registers = np.zeros(num_registers, dtype=np.int64)
+    registers[register_maxima.index.to_numpy()] = register_maxima.to_numpy()
+
+    alpha = 0.7213 / (1 + 1.079 / num_registers)
+    estimate = alpha * num_registers ** 2 / np.sum(np.power(2.0, -registers))
+    empty_registers = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * num_registers and empty_registers:
+        # Linear counting is more accurate for small cardinalities.
+        estimate = num_registers * np.log(num_registers / empty_registers)
+    return int(round(estimate))
+
+
+def approximate_describe(df: pd.DataFrame, sample_size: int = SAMPLE_SIZE, random_state: int = 0) -> pd.DataFrame:
+    """
+    Summarizes `df` in bounded time. Counts, null counts, min, max, mean and standard deviation are computed exactly
+    in a single pass over each column; quantiles are taken from a uniform random sample of the rows, and distinct
+    counts are estimated with a HyperLogLog sketch.
+    """
+    # Sampling positions with replacement avoids permuting every row of the frame.
+    positions = np.random.default_rng(random_state).integers(0, len(df), size=min(sample_size, len(df)))
+    sample = df.take(positions)
+    numeric = df.select_dtypes(include="number")
+    numeric_sample = sample[numeric.columns]
+
+    stats = {
+        "count": df.count(),
+        "null_count": df.isna().sum(),
+        "mean": numeric.mean(),
+        "std": numeric.std(),
+        "min": numeric.min(),
+        "25%": numeric_sample.quantile(0.25),
+        "50%": numeric_sample.quantile(0.5),
+        "75%": numeric_sample.quantile(0.75),
+        "max": numeric.max(),
+        "distinct (approx)": pd.Series({col: hll_distinct_count(df[col]) for col in df.columns}, dtype="int64"),
+    }
+    return pd.DataFrame(stats).T.reindex(columns=df.columns)
+
+
+def describe_frame(df: pd.DataFrame, row_threshold: int = APPROX_ROW_THRESHOLD, sample_size: int = SAMPLE_SIZE) -> dict:
+    """
+    Returns the statistics of `df` along with whether they are approximate. Frames at or under `row_threshold` rows
+    get an exact `describe()`.
+    """
+    # Reductions aren't implemented for sparse columns, so they are described from their dense values. Only those columns
+    # are densified, into a shallow copy that shares every other column with `df`.
+    sparse_columns = [column for column, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)]
+    if sparse_columns:
+        df = df.copy(deep=False)
+        for column in sparse_columns:
+            df[column] = df[column].sparse.to_dense()
+    if len(df) <= row_threshold:
+        return {
+            "statistics": str(df.describe()),
+            "approximate_statistics": False,
+        }
+    return {
+        "statistics": str(approximate_describe(df, sample_size=sample_size)),
+        "approximate_statistics": True,
+        "statistics_sample_size": min(sample_size, len(df)),
+    }
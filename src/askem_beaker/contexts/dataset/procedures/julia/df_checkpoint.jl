@@ -0,0 +1,18 @@
+_dataset_require("Arrow")
+using Arrow, Serialization
+
+_checkpoint_dir = "{{ checkpoint_dir }}"
+_result = Dict()
+{% for var_name in var_names -%}
+# Written uncompressed so that the file can be memory mapped on restore. Frames that arrow can't represent are
+# serialized instead.
+try
+    Arrow.write(joinpath(_checkpoint_dir, "{{ var_name }}.arrow"), {{ var_name }})
+    _result["{{ var_name }}"] = Dict("file" => "{{ var_name }}.arrow", "format" => "arrow")
+catch
+    rm(joinpath(_checkpoint_dir, "{{ var_name }}.arrow"); force=true)
+    serialize(joinpath(_checkpoint_dir, "{{ var_name }}.jls"), {{ var_name }})
+    _result["{{ var_name }}"] = Dict("file" => "{{ var_name }}.jls", "format" => "serialized")
+end
+{% endfor %}
+JSON3.write(_result) |> DisplayAs.unlimited
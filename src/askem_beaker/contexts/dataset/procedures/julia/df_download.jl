@@ -1,8 +1,18 @@
-_output_buff = IOBuffer()
-CSV.write(_output_buff, {{ var_name|default("df") }}, writeheader=true)
-
-seekstart(_output_buff)
-
-for _line in readlines(_output_buff)
-    println(_line)
-end
+# Serialize the frame once to a spool file on disk; the context streams it back to the client in chunks.
+_spool_path = tempname() * ".{{ format|default("csv") }}"
+{% if format == "parquet" -%}
+_dataset_require("Parquet2")
+using Parquet2
+Parquet2.writefile(_spool_path, {{ var_name|default("df") }}; compression_codec=:{{ compression|default("snappy")|lower }})
+{% elif format == "arrow" -%}
+_dataset_require("Arrow")
+using Arrow
+Arrow.write(_spool_path, {{ var_name|default("df") }}; compress=:{{ compression|default("lz4")|lower }}, ntasks=Threads.nthreads())
+{% else -%}
+CSV.write(_spool_path, {{ var_name|default("df") }}, writeheader=true)
+{% endif %}
+_result = Dict(
+    "path" => _spool_path,
+    "size" => stat(_spool_path).size,
+)
+JSON3.write(_result) |> DisplayAs.unlimited
@@ -1,17 +1,73 @@
-_result = Dict()
-_var_syms = names(Main)
+# Registry of the DataFrames described on previous runs, keyed by binding name, holding each frame's fingerprint and
+# its last description so that frames that haven't changed are not described again.
+if !isdefined(Main, :_df_info_registry)
+    _df_info_registry = Dict{Symbol, Tuple{UInt, Dict{String, Any}}}()
+end
+# Fingerprints of the descriptions the context holds, which are reported back as unchanged when they still match.
+_known_fingerprints = Dict{String, String}({% for var_name, fingerprint in (known_fingerprints|default({})).items() %}{{ var_name|tojson }} => {{ fingerprint|tojson }}, {% endfor %})
+# Frames with more rows than this are fingerprinted from evenly spaced rows instead of every row. The rows of the head
+# shown in the preview are always part of the sample. Past this many rows, the statistics of a frame can stay stale
+# after an edit to rows outside the sample until its shape or sampled rows change.
+_df_info_hash_row_limit = {{ approx_row_threshold|default(1000000) }}
+_df_info_head_rows = 30
+# Once this many seconds have been spent, remaining changed frames are deferred to a later run. At least one frame is
+# always described so that repeated runs make progress.
+_df_info_time_budget = {{ time_budget|default("nothing", true) }}
+_df_info_start_time = time()
+_df_info_described = 0
 
-for _var_sym in _var_syms
-    _var = eval(_var_sym)
-    if typeof(_var) == DataFrame
-        _data = [Array(_r) for _r=eachrow(first(_var, 30))]
-        _result["$(_var_sym)"] = Dict(
-            "columns" => names(_var),
-            "head" => _data,
-            "datatypes" => string(eltype.(eachcol(_var))),
-            "statistics" => string(describe(_var)),
-        )
+function _df_fingerprint(df::DataFrame)
+    rows = if nrow(df) > _df_info_hash_row_limit
+        sort!(union(1:_df_info_head_rows, 1:(nrow(df) ÷ _df_info_hash_row_limit + 1):nrow(df)))
+    else
+        1:nrow(df)
+    end
+    h = hash((objectid(df), size(df), names(df), eltype.(eachcol(df))))
+    for col in eachcol(df)
+        h = hash(view(col, rows), h)
     end
+    return h
 end
 
+_result = Dict{String, Any}()
+_df_syms = Symbol[]
+
+for _var_sym in names(Main)
+    # Check the binding's type directly instead of eval-ing every name in Main.
+    (isdefined(Main, _var_sym) && !startswith(string(_var_sym), "_")) || continue
+    _var = getfield(Main, _var_sym)
+    _var isa DataFrame || continue
+    push!(_df_syms, _var_sym)
+
+    _fingerprint = _df_fingerprint(_var)
+    if get(_known_fingerprints, "$(_var_sym)", nothing) == string(_fingerprint)
+        _result["$(_var_sym)"] = Dict("unchanged" => true)
+        continue
+    end
+    _cached = get(_df_info_registry, _var_sym, nothing)
+    if _cached !== nothing && first(_cached) == _fingerprint
+        _result["$(_var_sym)"] = last(_cached)
+        continue
+    end
+    if _df_info_time_budget !== nothing && _df_info_described > 0 && time() - _df_info_start_time > _df_info_time_budget
+        _result["$(_var_sym)"] = Dict("deferred" => true)
+        continue
+    end
+
+    _data = [Array(_r) for _r=eachrow(first(_var, _df_info_head_rows))]
+    _info = Dict{String, Any}(
+        "columns" => names(_var),
+        "head" => _data,
+        "datatypes" => string(eltype.(eachcol(_var))),
+        "dtypes" => Dict(_name => string(eltype(_col)) for (_name, _col) in zip(names(_var), eachcol(_var))),
+        "statistics" => string(describe(_var)),
+        "fingerprint" => string(_fingerprint),
+    )
+    _df_info_registry[_var_sym] = (_fingerprint, _info)
+    global _df_info_described += 1
+    _result["$(_var_sym)"] = _info
+end
+
+filter!(_entry -> first(_entry) in _df_syms, _df_info_registry)
+
 JSON3.write(_result) |> DisplayAs.unlimited
@@ -0,0 +1,49 @@
+_dataset_require("PooledArrays")
+using PooledArrays
+
+function _optimize_column(col)
+    _values = collect(skipmissing(col))
+    isempty(_values) && return col
+    _T = nonmissingtype(eltype(col))
+    if _T <: Integer && !(_T <: Bool)
+        _low, _high = extrema(_values)
+        for _narrow in (Int8, Int16, Int32)
+            if sizeof(_narrow) < sizeof(_T) && typemin(_narrow) <= _low && _high <= typemax(_narrow)
+                return convert(AbstractVector{Missing <: eltype(col) ? Union{_narrow, Missing} : _narrow}, col)
+            end
+        end
+    elseif _T == Float64
+        # Only narrowed when no value loses precision, as Float32 is otherwise not an exact representation.
+        if all(_v -> isnan(_v) || Float64(Float32(_v)) == _v, _values)
+            return convert(AbstractVector{Missing <: eltype(col) ? Union{Float32, Missing} : Float32}, col)
+        end
+    elseif _T <: AbstractString && !(col isa PooledArray)
+        if length(unique(_values)) / length(col) <= {{ category_ratio }}
+            return PooledArray(col)
+        end
+    end
+    return col
+end
+
+_result = Dict()
+{% for var_name in var_names -%}
+_columns = []
+for _name in names({{ var_name }})
+    _before = {{ var_name }}[!, _name]
+    _after = _optimize_column(_before)
+    push!(_columns, Dict(
+        "column" => _name,
+        "dtype_before" => string(eltype(_before)),
+        "dtype_after" => string(eltype(_after)),
+        "bytes_before" => Base.summarysize(_before),
+        "bytes_after" => Base.summarysize(_after),
+    ))
+    {{ var_name }}[!, _name] = _after
+end
+_result["{{ var_name }}"] = Dict(
+    "columns" => _columns,
+    "bytes_before" => sum(_c["bytes_before"] for _c in _columns; init=0),
+    "bytes_after" => sum(_c["bytes_after"] for _c in _columns; init=0),
+)
+{% endfor %}
+JSON3.write(_result) |> DisplayAs.unlimited
@@ -0,0 +1,47 @@
+_page_spec = JSON3.read({{ page_spec|tojson|tojson|replace("$", "\\$") }})
+_df = {{ var_name|default("df") }}
+
+_df_page_operators = Dict(
+    "==" => (col, value) -> col .== value,
+    "!=" => (col, value) -> col .!= value,
+    "<" => (col, value) -> col .< value,
+    "<=" => (col, value) -> col .<= value,
+    ">" => (col, value) -> col .> value,
+    ">=" => (col, value) -> col .>= value,
+    "contains" => (col, value) -> occursin.(string(value), string.(col)),
+)
+
+# Left as a range unless a filter or sort is given, so that an unsorted page doesn't allocate every row position.
+_positions = 1:nrow(_df)
+if _page_spec[:filters] !== nothing && !isempty(_page_spec[:filters])
+    _mask = trues(nrow(_df))
+    for _filter in _page_spec[:filters]
+        _mask .&= coalesce.(_df_page_operators[_filter[:op]](_df[!, String(_filter[:column])], _filter[:value]), false)
+    end
+    _positions = findall(_mask)
+end
+if _page_spec[:sort] !== nothing
+    _sort_col = view(_df[!, String(_page_spec[:sort][:column])], _positions)
+    # Missing values are kept last whichever the direction, as reversing the order would otherwise put them first.
+    _sort_missing = ismissing.(_sort_col)
+    _sort_present = findall(!, _sort_missing)
+    _positions = vcat(
+        _positions[_sort_present][sortperm(view(_sort_col, _sort_present); rev=!get(_page_spec[:sort], :ascending, true))],
+        _positions[_sort_missing],
+    )
+end
+
+_row_range = (_page_spec[:row_offset] + 1):min(_page_spec[:row_offset] + _page_spec[:row_limit], length(_positions))
+_col_range = (_page_spec[:column_offset] + 1):min(_page_spec[:column_offset] + _page_spec[:column_limit], ncol(_df))
+# A view over only the requested window; the frame itself is never copied.
+_page = view(_df, _positions[_row_range], _col_range)
+
+_result = Dict(
+    "total_rows" => length(_positions),
+    "total_columns" => ncol(_df),
+    "row_offset" => _page_spec[:row_offset],
+    "column_offset" => _page_spec[:column_offset],
+    "columns" => names(_page),
+    "rows" => [Array(_r) for _r=eachrow(_page)],
+)
+JSON3.write(_result) |> DisplayAs.unlimited
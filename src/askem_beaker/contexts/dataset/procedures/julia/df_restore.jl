@@ -0,0 +1,13 @@
+_dataset_require("Arrow")
+using Arrow, Serialization
+
+_checkpoint_dir = "{{ checkpoint_dir }}"
+{% for var_name, frame in frames.items() -%}
+{% if frame.format == "arrow" -%}
+# Columns are copied out of the Arrow table, as columns backed by it are read-only and the restored frame must be
+# modifiable like the one saved.
+{{ var_name }} = DataFrame(Arrow.Table(joinpath(_checkpoint_dir, "{{ frame.file }}")); copycols=true)
+{% else -%}
+{{ var_name }} = deserialize(joinpath(_checkpoint_dir, "{{ frame.file }}"))
+{% endif -%}
+{% endfor %}
@@ -1,13 +1,28 @@
 using Dates
 
-_temp_csv_file = tempname()
-CSV.write(_temp_csv_file, {{ var_name|default("df") }}, writeheader=true)
-_filesize = stat(_temp_csv_file).size
-_upload_response = HTTP.put("{{data_url}}", ["content-length" => _filesize], open(_temp_csv_file, "r"))
+{% if format == "parquet" -%}
+_dataset_require("Parquet2")
+using Parquet2
+_temp_file = tempname() * ".parquet"
+Parquet2.writefile(_temp_file, {{ var_name|default("df") }}; compression_codec=:{{ compression|default("snappy")|lower }})
+{% elif format == "arrow" -%}
+_dataset_require("Arrow")
+using Arrow
+_temp_file = tempname() * ".arrow"
+Arrow.write(_temp_file, {{ var_name|default("df") }}; compress=:{{ compression|default("lz4")|lower }}, ntasks=Threads.nthreads())
+{% else -%}
+_temp_file = tempname() * ".csv"
+CSV.write(_temp_file, {{ var_name|default("df") }}, writeheader=true)
+{% endif -%}
+_filesize = stat(_temp_file).size
+# The file is streamed from disk as the request body rather than read into memory.
+_upload_response = open(_temp_file, "r") do _io
+    HTTP.put("{{data_url}}", ["content-length" => _filesize], _io)
+end
 
 if _upload_response.status != 200
     error("Error uploading dataframe: $(String(_upload_response.body))")
 end
 
 # Cleanup
-rm(_temp_csv_file)
+rm(_temp_file)
@@ -1,3 +1,109 @@
-{% for var_name, data_url in var_map.items() -%}
-{{ var_name|default("df") }} = DataFrame(CSV.File(IOBuffer(HTTP.get("{{ data_url }}").body)))
+using Dates
+
+_df_load_operators = Dict(
+    "==" => (col, value) -> col .== value,
+    "!=" => (col, value) -> col .!= value,
+    "<" => (col, value) -> col .< value,
+    "<=" => (col, value) -> col .<= value,
+    ">" => (col, value) -> col .> value,
+    ">=" => (col, value) -> col .>= value,
+    "contains" => (col, value) -> occursin.(string(value), string.(col)),
+)
+_df_load_types = Dict(
+    "int64" => Int64, "int32" => Int32, "float64" => Float64, "float32" => Float32, "bool" => Bool,
+    "string" => String, "object" => String, "category" => String, "date" => Date, "datetime64[ns]" => DateTime,
+    "Int64" => Int64, "Int32" => Int32, "Float64" => Float64, "Float32" => Float32, "Bool" => Bool,
+    "Date" => Date, "DateTime" => DateTime,
+)
+# Number of tasks CSV files are parsed with, and the most bytes of a CSV file parsed at once when filtering rows.
+_df_load_ntasks = {{ csv_ntasks|default("Threads.nthreads()", true) }}
+_df_load_chunk_bytes = {{ csv_chunk_bytes|default(64 * 1024 * 1024) }}
+
+function _df_load_type(name)
+    _match = match(r"^Union\{Missing, (.+)\}$", name)
+    return get(_df_load_types, _match === nothing ? name : _match[1], nothing)
+end
+
+# The columns to read: the requested ones plus those the row filter tests, which are dropped once rows are filtered.
+function _df_load_columns(options)
+    options[:columns] === nothing && return nothing
+    filter_columns = options[:row_filter] === nothing ? String[] : [String(_filter[:column]) for _filter in options[:row_filter]]
+    return union(String.(options[:columns]), filter_columns)
+end
+
+function _df_load_filter(df, row_filter, nrows; columns=nothing)
+    if row_filter !== nothing && !isempty(row_filter)
+        _mask = trues(nrow(df))
+        for _filter in row_filter
+            _mask .&= coalesce.(_df_load_operators[_filter[:op]](df[!, String(_filter[:column])], _filter[:value]), false)
+        end
+        df = df[_mask, :]
+    end
+    df = nrows === nothing ? df : first(df, nrows)
+    return columns === nothing ? df : select(df, String.(columns); copycols=false)
+end
+
+function _df_load_types_for(dtypes)
+    return Dict{String, Type}(
+        String(_k) => _df_load_type(_v) for (_k, _v) in something(dtypes, Dict()) if _df_load_type(_v) !== nothing
+    )
+end
+
+function _df_read_csv(path, options, types; strict=false)
+    args = (;
+        ntasks=_df_load_ntasks,
+        select=_df_load_columns(options),
+        types=isempty(types) ? nothing : types,
+        strict=strict,
+    )
+    if options[:row_filter] === nothing || isempty(options[:row_filter])
+        return DataFrame(CSV.File(path; limit=options[:nrows], args...))
+    end
+    # Filter each chunk as it is parsed so that rows which don't match are never held in memory together.
+    df = DataFrame()
+    for chunk in CSV.Chunks(path; args..., ntasks=max(_df_load_ntasks, cld(filesize(path), _df_load_chunk_bytes)))
+        append!(df, _df_load_filter(DataFrame(chunk), options[:row_filter], nothing); cols=:union)
+        options[:nrows] !== nothing && nrow(df) >= options[:nrows] && break
+    end
+    return _df_load_filter(df, nothing, options[:nrows]; columns=options[:columns])
+end
+
+function _df_load_csv(path, options)
+    types = _df_load_types_for(options[:dtypes])
+    hints = _df_load_types_for(get(options, :dtype_hints, nothing))
+    if !isempty(hints)
+        # Hints are the types recorded from an earlier load of the same file. Parsing strictly makes a file that no
+        # longer matches them fail, rather than reading mismatched values as missing, so that it can be read again
+        # with its types inferred.
+        try
+            return _df_read_csv(path, options, merge(hints, types); strict=true)
+        catch
+        end
+    end
+    return _df_read_csv(path, options, types)
+end
+
+# Datasets are read from local copies in the shared dataset cache.
+{% for var_name, source in var_map.items() -%}
+_load_options = JSON3.read({{ source.options|tojson|tojson|replace("$", "\\$") }})
+{% if source.format == "parquet" -%}
+_dataset_require("Parquet2")
+using Parquet2
+_parquet_ds = Parquet2.Dataset("{{ source.path }}")
+{% if source.options.columns -%}
+_df = DataFrame([_col => Parquet2.load(_parquet_ds, _col) for _col in _df_load_columns(_load_options)])
+{% else -%}
+_df = DataFrame(_parquet_ds; copycols=false)
+{% endif -%}
+{{ var_name|default("df") }} = _df_load_filter(_df, _load_options[:row_filter], _load_options[:nrows]; columns=_load_options[:columns])
+{% elif source.format == "arrow" -%}
+_dataset_require("Arrow")
+using Arrow
+# Arrow tables are memory mapped, so selecting columns without copying only touches the requested data. Columns
+# backed by the table are read-only, so what is kept is then copied into ordinary vectors that can be modified.
+_df = DataFrame(Arrow.Table("{{ source.path }}"); copycols=false)
+{{ var_name|default("df") }} = DataFrame(_df_load_filter(_df, _load_options[:row_filter], _load_options[:nrows]; columns=_load_options[:columns]); copycols=true)
+{% else -%}
+{{ var_name|default("df") }} = _df_load_csv("{{ source.path }}", _load_options)
+{% endif -%}
 {% endfor %}
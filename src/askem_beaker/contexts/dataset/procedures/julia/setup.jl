@@ -1 +1,9 @@
 using DataFrames, CSV, HTTP, JSON3, DisplayAs
+
+# Packages that only some formats need are checked for before they are loaded, so that a missing one fails with a clear
+# message.
+function _dataset_require(package)
+    if Base.find_package(package) === nothing
+        error("The Julia package $(package) is required for this operation but is not installed in the Julia environment.")
+    end
+end
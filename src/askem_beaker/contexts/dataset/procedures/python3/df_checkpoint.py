@@ -0,0 +1,20 @@
+import os
+
+import pyarrow as pa
+import pyarrow.feather
+
+_checkpoint_dir = '{{ checkpoint_dir }}'
+_result = {}
+{% for var_name in var_names -%}
+# Written uncompressed so that the file can be memory mapped on restore. Frames that arrow can't represent, such as
+# those with mixed-type object columns, are pickled instead.
+try:
+    pyarrow.feather.write_feather({{ var_name }}, os.path.join(_checkpoint_dir, "{{ var_name }}.arrow"), compression="uncompressed")
+    _result["{{ var_name }}"] = {"file": "{{ var_name }}.arrow", "format": "arrow"}
+except (pa.ArrowException, TypeError, ValueError):
+    if os.path.exists(os.path.join(_checkpoint_dir, "{{ var_name }}.arrow")):
+        os.remove(os.path.join(_checkpoint_dir, "{{ var_name }}.arrow"))
+    {{ var_name }}.to_pickle(os.path.join(_checkpoint_dir, "{{ var_name }}.pkl"))
+    _result["{{ var_name }}"] = {"file": "{{ var_name }}.pkl", "format": "pickle"}
+{% endfor %}
+_result
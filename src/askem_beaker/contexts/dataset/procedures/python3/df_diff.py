@@ -0,0 +1,17 @@
+import json
+
+from askem_beaker.contexts.dataset.lib.diff import column_schema, diff_frames
+from askem_beaker.contexts.dataset.lib.loaders import read_dataset
+
+_df = {{ var_name|default("df") }}
+_diff = None
+{% if baseline -%}
+# The frame as originally loaded is read back from the dataset cache rather than being kept in memory all session.
+try:
+    _baseline = read_dataset('{{ baseline.path }}', '{{ baseline.format }}', **json.loads({{ baseline.options|tojson|tojson }}))
+    _diff = diff_frames(_baseline, _df)
+except (OSError, TypeError, ValueError):
+    pass
+_baseline = None
+{% endif -%}
+{"columns": column_schema(_df), "diff": _diff}
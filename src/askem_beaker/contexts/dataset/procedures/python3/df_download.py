@@ -1,7 +1,19 @@
-import pandas as pd; import io
-output_buff = io.BytesIO()
-{{ var_name|default("df") }}.to_csv(output_buff, index=False, header=True)
-output_buff.seek(0)
+import os
+import tempfile
 
-for line in output_buff.getvalue().splitlines():
-    print(line.decode())
+# Serialize the frame once to a spool file on disk; the context streams it back to the client in chunks.
+_spool_fd, _spool_path = tempfile.mkstemp(prefix="beaker_download_", suffix=".{{ format|default("csv") }}")
+with os.fdopen(_spool_fd, "wb") as _spool_file:
+{%- if format == "parquet" %}
+    {{ var_name|default("df") }}.to_parquet(_spool_file, index=False, compression="{{ compression|default("snappy") }}")
+{%- elif format == "arrow" %}
+    {{ var_name|default("df") }}.reset_index(drop=True).to_feather(_spool_file, compression="{{ compression|default("lz4") }}")
+{%- else %}
+    {{ var_name|default("df") }}.to_csv(_spool_file, index=False, header=True)
+{%- endif %}
+
+_result = {
+    "path": _spool_path,
+    "size": os.path.getsize(_spool_path),
+}
+_result
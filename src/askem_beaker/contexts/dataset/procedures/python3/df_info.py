@@ -1,17 +1,76 @@
 import copy
+import hashlib
 import json
+import time
+import numpy as np
 import pandas as pd
+from askem_beaker.contexts.dataset.lib.statistics import describe_frame
+
+# Frames with more rows than this are fingerprinted from an evenly spaced sample of rows instead of every row. The
+# rows of the head shown in the preview are always part of the sample. This is the row count above which statistics are
+# approximated from a sample anyway, so exact statistics always follow edits to any row, while approximate ones can stay
+# stale after an edit to rows outside the sample until the frame's shape or sampled rows change.
+_DF_INFO_HASH_ROW_LIMIT = {{ approx_row_threshold|default(1000000) }}
+_DF_INFO_HEAD_ROWS = 30
+# Fingerprints of the descriptions the context holds, so that only frames that have changed since need their head and
+# statistics recomputed.
+_known_fingerprints = {{ known_fingerprints|default({})|tojson }}
+# Once this many seconds have been spent, remaining changed frames are deferred to a later run. At least one frame is
+# always described so that repeated runs make progress.
+_time_budget = {{ time_budget|default("None", true) }}
+_start_time = time.monotonic()
+_described = 0
+
+
+def _df_fingerprint(df):
+    if len(df) > _DF_INFO_HASH_ROW_LIMIT:
+        sample = df.iloc[
+            np.union1d(np.arange(_DF_INFO_HEAD_ROWS), np.arange(0, len(df), len(df) // _DF_INFO_HASH_ROW_LIMIT + 1))
+        ]
+    else:
+        sample = df
+    try:
+        # The row hashes are hashed in order, so reordering the rows in place changes the fingerprint.
+        content_hash = hashlib.sha1(pd.util.hash_pandas_object(sample, index=True).to_numpy().tobytes()).hexdigest()
+    except TypeError:
+        # Unhashable cell values (lists, dicts, etc) fall back to the repr of the sample.
+        content_hash = hashlib.sha1(sample.to_string().encode()).hexdigest()
+    return hashlib.sha1(
+        repr((
+            id(df),
+            df.shape,
+            tuple(str(col) for col in df.columns),
+            tuple(str(dtype) for dtype in df.dtypes),
+            content_hash,
+        )).encode()
+    ).hexdigest()
+
 
 _result = {}
+_df_vars = {k: v for k, v in copy.copy(locals()).items() if isinstance(v, pd.DataFrame) and not k.startswith("_")}
 
-for _var_name, _df in ((k, v) for k, v in copy.copy(locals()).items() if isinstance(v, pd.DataFrame) and not k.startswith("_")):
-    _split_df = json.loads(_df.head(30).to_json(orient="split"))
+for _var_name, _df in _df_vars.items():
+    _fingerprint = _df_fingerprint(_df)
+    if _known_fingerprints.get(_var_name) == _fingerprint:
+        _result[_var_name] = {"unchanged": True}
+        continue
+    if _time_budget is not None and _described and time.monotonic() - _start_time > _time_budget:
+        _result[_var_name] = {"deferred": True}
+        continue
 
+    _split_df = json.loads(_df.head(_DF_INFO_HEAD_ROWS).to_json(orient="split"))
     _result[_var_name] = {
         "columns": _split_df["columns"],
         "datatypes": str(_df.dtypes),
+        "dtypes": {str(_column): str(_dtype) for _column, _dtype in _df.dtypes.items()},
         "head": [_split_df["columns"]] + _split_df["data"],
-        "statistics": str(_df.describe()),
+        "fingerprint": _fingerprint,
+        **describe_frame(
+            _df,
+            row_threshold=_DF_INFO_HASH_ROW_LIMIT,
+            sample_size={{ sample_size|default(100000) }},
+        ),
     }
+    _described += 1
 
-_result
\ No newline at end of file
+_result
@@ -0,0 +1,11 @@
+from askem_beaker.contexts.dataset.lib.memory import optimize_frame
+
+_result = {}
+{% for var_name in var_names -%}
+{{ var_name }}, _result["{{ var_name }}"] = optimize_frame(
+    {{ var_name }},
+    category_ratio={{ category_ratio }},
+    sparse_ratio={{ sparse_ratio }},
+)
+{% endfor %}
+_result
@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pandas as pd
+from askem_beaker.contexts.dataset.lib.filters import filter_mask
+
+_page_spec = json.loads({{ page_spec|tojson|tojson }})
+_df = {{ var_name|default("df") }}
+
+
+# Row positions are recomputed on every request: a cache keyed on the frame can't tell when its values are edited in
+# place, and would keep an array of every row position alive for each variable.
+def _df_page_row_positions(df, filters, sort):
+    positions = None
+    if filters:
+        positions = np.flatnonzero(filter_mask(df, filters))
+    if sort:
+        column = df[sort["column"]] if positions is None else df[sort["column"]].take(positions)
+        # Sorted by value rather than with argsort, which gives missing values a position of -1, and with missing
+        # values kept last whichever the direction.
+        order = (
+            column.reset_index(drop=True)
+            .sort_values(ascending=sort.get("ascending", True), kind="stable", na_position="last")
+            .index.to_numpy()
+        )
+        positions = order if positions is None else positions[order]
+    return positions
+
+
+_positions = _df_page_row_positions(_df, _page_spec.get("filters"), _page_spec.get("sort"))
+
+_row_start = _page_spec["row_offset"]
+_row_stop = _row_start + _page_spec["row_limit"]
+_col_slice = slice(_page_spec["column_offset"], _page_spec["column_offset"] + _page_spec["column_limit"])
+# Only the requested window is ever materialized; the frame itself is never copied.
+if _positions is None:
+    _page = _df.iloc[_row_start:_row_stop, _col_slice]
+else:
+    _page = _df.iloc[_positions[_row_start:_row_stop], _col_slice]
+_split_page = json.loads(_page.to_json(orient="split", index=False))
+
+_result = {
+    "total_rows": len(_df) if _positions is None else len(_positions),
+    "total_columns": len(_df.columns),
+    "row_offset": _row_start,
+    "column_offset": _page_spec["column_offset"],
+    "columns": _split_page["columns"],
+    "rows": _split_page["data"],
+}
+_result
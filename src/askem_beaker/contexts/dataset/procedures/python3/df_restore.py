@@ -0,0 +1,14 @@
+import os
+
+import pandas as pd
+import pyarrow.feather
+
+_checkpoint_dir = '{{ checkpoint_dir }}'
+{% for var_name, frame in frames.items() -%}
+{% if frame.format == "arrow" -%}
+# Converted into consolidated blocks, which copies the columns out of the memory-mapped file into writable arrays.
+{{ var_name }} = pyarrow.feather.read_table(os.path.join(_checkpoint_dir, "{{ frame.file }}"), memory_map=True).to_pandas()
+{% else -%}
+{{ var_name }} = pd.read_pickle(os.path.join(_checkpoint_dir, "{{ frame.file }}"))
+{% endif -%}
+{% endfor %}
@@ -1,10 +1,52 @@
-import requests
 import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+
+_df = {{ var_name|default("df") }}
+_format = "{{ format|default("csv") }}"
+_compression = {{ compression|tojson if compression else "None" }}
+_upload_url = '{{data_url}}'
+# Rows converted to Arrow at a time when writing columnar formats, so that the frame is never copied whole.
+_batch_rows = 100_000
+_max_retries = {{ max_retries|default(3) }}
+
+
+def _serialize(df, sink):
+    if _format == "csv":
+        df.to_csv(sink, index=False, header=True)
+        return
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    if _format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression=_compression or "snappy")
+    else:
+        writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression=_compression or "lz4"))
+    with writer:
+        for start in range(0, max(len(df), 1), _batch_rows):
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + _batch_rows], schema=schema, preserve_index=False))
+
+
+def _upload(df):
+    # Saving as a temporary file instead of a buffer to save memory. Attempts that fail to connect or get a server error
+    # are retried; any other response, e.g. an expired upload url, is returned as is.
+    with tempfile.TemporaryFile() as temp_file:
+        _serialize(df, temp_file)
+        for attempt in range(_max_retries):
+            temp_file.seek(0)
+            try:
+                response = requests.put(_upload_url, data=temp_file)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == _max_retries - 1:
+                    raise
+            else:
+                if response.status_code < 500 or attempt == _max_retries - 1:
+                    return response
+            time.sleep(2 ** attempt)
+
 
-# Saving as a temporary file instead of a buffer to save memory
-with tempfile.TemporaryFile() as temp_csv_file:
-    {{ var_name|default("df") }}.to_csv(temp_csv_file, index=False, header=True)
-    temp_csv_file.seek(0)
-    upload_response = requests.put('{{data_url}}', data=temp_csv_file)
+upload_response = _upload(_df)
 if upload_response.status_code != 200:
     raise Exception(f"Error uploading dataframe: {upload_response.content}")
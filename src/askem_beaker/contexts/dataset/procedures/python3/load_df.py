@@ -1,5 +1,8 @@
-import pandas as pd
+import json
 
-{% for var_name, data_url in var_map.items() -%}
-{{ var_name }} = pd.read_csv('{{ data_url }}',)
+from askem_beaker.contexts.dataset.lib.loaders import read_dataset
+
+# Datasets are read from local copies in the shared dataset cache.
+{% for var_name, source in var_map.items() -%}
+{{ var_name }} = read_dataset('{{ source.path }}', '{{ source.format }}', **json.loads({{ source.options|tojson|tojson }}))
 {% endfor %}
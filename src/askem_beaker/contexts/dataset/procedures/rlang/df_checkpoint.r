@@ -0,0 +1,19 @@
+library(jsonlite)
+
+.checkpoint_dir <- "{{ checkpoint_dir }}"
+.result <- setNames(list(), character(0))
+{% for var_name in var_names -%}
+# Written uncompressed so that the file can be memory mapped on restore. Data.frames that arrow can't represent are
+# saved as RDS instead.
+.result[["{{ var_name }}"]] <- tryCatch({
+    arrow::write_feather({{ var_name }}, file.path(.checkpoint_dir, "{{ var_name }}.arrow"), compression = "uncompressed")
+    list(file = "{{ var_name }}.arrow", format = "arrow")
+}, error = function(e) {
+    unlink(file.path(.checkpoint_dir, "{{ var_name }}.arrow"))
+    saveRDS({{ var_name }}, file.path(.checkpoint_dir, "{{ var_name }}.rds"))
+    list(file = "{{ var_name }}.rds", format = "rds")
+})
+{% endfor %}
+.p <- toJSON(.result, auto_unbox = TRUE)
+.f <- toString(.p)
+print(.f)
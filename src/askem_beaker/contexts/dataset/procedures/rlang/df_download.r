@@ -1,8 +1,17 @@
-import pandas as pd; import io
-import time
-output_buff = io.BytesIO()
-{{ var_name|default("df") }}.to_csv(output_buff, index=False, header=True)
-output_buff.seek(0)
+library(jsonlite)
 
-for line in output_buff.getvalue().splitlines():
-    print(line.decode())
+# Serialize the frame once to a spool file on disk; the context streams it back to the client in chunks.
+.spool_path <- tempfile(pattern = "beaker_download_", fileext = ".{{ format|default("csv") }}")
+{% if format == "parquet" -%}
+.dataset_require("arrow")
+arrow::write_parquet({{ var_name|default("df") }}, .spool_path, compression = "{{ compression|default("snappy") }}")
+{% elif format == "arrow" -%}
+.dataset_require("arrow")
+arrow::write_feather({{ var_name|default("df") }}, .spool_path, compression = "{{ compression|default("lz4") }}")
+{% else -%}
+.dataset_write_csv({{ var_name|default("df") }}, .spool_path)
+{% endif %}
+.result <- list(path = .spool_path, size = file.size(.spool_path))
+.p <- toJSON(.result, auto_unbox = TRUE)
+.f <- toString(.p)
+print(.f)
@@ -1,25 +1,60 @@
 library(jsonlite)
-.result = list()
 
-for (.var_name in ls()) {
+# Fingerprints of the descriptions the context holds, so that only data.frames that have changed since need their
+# head and statistics recomputed.
+.known_fingerprints <- list({% for var_name, fingerprint in (known_fingerprints|default({})).items() %}{{ var_name|tojson }} = {{ fingerprint|tojson }}{% if not loop.last %}, {% endif %}{% endfor %})
+# Data.frames with more rows than this are fingerprinted from an evenly spaced sample of rows instead of every row.
+# The rows of the head shown in the preview are always part of the sample. Past this many rows, the statistics of a
+# data.frame can stay stale after an edit to rows outside the sample until its shape or sampled rows change.
+.hash_row_limit <- {{ approx_row_threshold|default(1000000) }}
+.head_rows <- 30
+# Once this many seconds have been spent, remaining changed data.frames are deferred to a later run. At least one
+# data.frame is always described so that repeated runs make progress.
+.time_budget <- {{ time_budget|default("NULL", true) }}
+.start_time <- Sys.time()
+.described <- 0
+
+.df_fingerprint <- function(df) {
+    rows <- nrow(df)
+    sample_rows <- if (rows > .hash_row_limit) {
+        sort(union(seq_len(.head_rows), seq(1, rows, by = rows %/% .hash_row_limit + 1)))
+    } else {
+        seq_len(rows)
+    }
+    digest::digest(
+        list(dim(df), names(df), lapply(df, class), df[sample_rows, , drop = FALSE]),
+        algo = "xxhash64"
+    )
+}
+
+.result <- setNames(list(), character(0))
+.df_vars <- Filter(function(.name) is.data.frame(get(.name)), ls())
+
+for (.var_name in .df_vars) {
     .df <- get(.var_name)
-    if (is.data.frame(.df)) {
-        .col_names <- names(.df)
-        .head <- list(as.list(.col_names))
-        for (.i in 1:30) {
-            .row <- list()
-            for (.col_name in .col_names) {
-                .row<-append(.row, .df[[.col_name]][.i])
-            }
-            .head<-append(.head, list(.row))
-        }
-        .col_types <- as.list(sapply(.df, class))
-        .col_stats <- toString(as.list(lapply(.df, summary)))
-        .row_info <- list( columns = .col_names, datatypes = .col_types, head = .head, statistics = .col_stats)
-        .result[[.var_name]] <- .row_info
+    .fingerprint <- .df_fingerprint(.df)
+    if (identical(.known_fingerprints[[.var_name]], .fingerprint)) {
+        .result[[.var_name]] <- list(unchanged = TRUE)
+        next
+    }
+    if (!is.null(.time_budget) && .described > 0 && as.numeric(difftime(Sys.time(), .start_time, units = "secs")) > .time_budget) {
+        .result[[.var_name]] <- list(deferred = TRUE)
+        next
     }
+
+    .col_names <- names(.df)
+    # Transpose the head slice into rows in a single call rather than building it up one cell at a time.
+    .rows <- do.call(Map, c(f = list, unname(as.list(head(.df, .head_rows)))))
+    .result[[.var_name]] <- list(
+        columns = .col_names,
+        datatypes = lapply(.df, class),
+        head = c(list(as.list(.col_names)), unname(.rows)),
+        statistics = toString(lapply(.df, summary)),
+        fingerprint = .fingerprint
+    )
+    .described <- .described + 1
 }
 
 .p <- toJSON(.result, auto_unbox = TRUE)
 .f <- toString(.p)
-print(.f)
\ No newline at end of file
+print(.f)
@@ -0,0 +1,38 @@
+library(jsonlite)
+
+.optimize_column <- function(col) {
+    .values <- col[!is.na(col)]
+    if (length(.values) == 0) return(col)
+    if (is.double(col) && all(.values == round(.values)) && all(abs(.values) <= .Machine$integer.max)) {
+        return(as.integer(col))
+    }
+    if (is.character(col) && length(unique(.values)) / length(col) <= {{ category_ratio }}) {
+        return(factor(col))
+    }
+    col
+}
+
+.result <- setNames(list(), character(0))
+{% for var_name in var_names -%}
+.columns <- list()
+for (.name in names({{ var_name }})) {
+    .before <- {{ var_name }}[[.name]]
+    .after <- .optimize_column(.before)
+    .columns[[length(.columns) + 1]] <- list(
+        column = .name,
+        dtype_before = class(.before)[[1]],
+        dtype_after = class(.after)[[1]],
+        bytes_before = as.numeric(object.size(.before)),
+        bytes_after = as.numeric(object.size(.after))
+    )
+    {{ var_name }}[[.name]] <- .after
+}
+.result[["{{ var_name }}"]] <- list(
+    columns = .columns,
+    bytes_before = sum(vapply(.columns, function(.c) .c$bytes_before, numeric(1))),
+    bytes_after = sum(vapply(.columns, function(.c) .c$bytes_after, numeric(1)))
+)
+{% endfor %}
+.p <- toJSON(.result, auto_unbox = TRUE)
+.f <- toString(.p)
+print(.f)
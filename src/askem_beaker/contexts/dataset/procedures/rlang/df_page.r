@@ -0,0 +1,45 @@
+library(jsonlite)
+
+.page_spec <- fromJSON({{ page_spec|tojson|tojson }}, simplifyDataFrame = FALSE)
+.df <- {{ var_name|default("df") }}
+
+.df_page_operators <- list(
+    "==" = `==`,
+    "!=" = `!=`,
+    "<" = `<`,
+    "<=" = `<=`,
+    ">" = `>`,
+    ">=" = `>=`,
+    "contains" = function(col, value) grepl(as.character(value), as.character(col), fixed = TRUE)
+)
+
+.positions <- seq_len(nrow(.df))
+if (length(.page_spec$filters) > 0) {
+    .mask <- rep(TRUE, nrow(.df))
+    for (.filter in .page_spec$filters) {
+        .matches <- .df_page_operators[[.filter$op]](.df[[.filter$column]], .filter$value)
+        .mask <- .mask & !is.na(.matches) & .matches
+    }
+    .positions <- which(.mask)
+}
+if (!is.null(.page_spec$sort)) {
+    .ascending <- if (is.null(.page_spec$sort$ascending)) TRUE else .page_spec$sort$ascending
+    .positions <- .positions[order(.df[[.page_spec$sort$column]][.positions], decreasing = !.ascending)]
+}
+
+.row_window <- .positions[seq_len(max(min(.page_spec$row_limit, length(.positions) - .page_spec$row_offset), 0)) + .page_spec$row_offset]
+.col_window <- seq_len(max(min(.page_spec$column_limit, ncol(.df) - .page_spec$column_offset), 0)) + .page_spec$column_offset
+# Only the requested window is extracted from the data.frame.
+.page <- .df[.row_window, .col_window, drop = FALSE]
+
+.result <- list(
+    total_rows = length(.positions),
+    total_columns = ncol(.df),
+    row_offset = .page_spec$row_offset,
+    column_offset = .page_spec$column_offset,
+    columns = names(.page),
+    rows = .page
+)
+.p <- toJSON(.result, auto_unbox = TRUE, dataframe = "values")
+.f <- toString(.p)
+print(.f)
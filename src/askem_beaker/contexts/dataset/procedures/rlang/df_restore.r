@@ -0,0 +1,9 @@
+.checkpoint_dir <- "{{ checkpoint_dir }}"
+{% for var_name, frame in frames.items() -%}
+{% if frame.format == "arrow" -%}
+.dataset_require("arrow")
+{{ var_name }} = as.data.frame(arrow::read_feather(file.path(.checkpoint_dir, "{{ frame.file }}"), mmap = TRUE))
+{% else -%}
+{{ var_name }} = readRDS(file.path(.checkpoint_dir, "{{ frame.file }}"))
+{% endif -%}
+{% endfor %}
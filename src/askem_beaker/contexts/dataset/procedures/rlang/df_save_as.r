@@ -1,10 +1,16 @@
-import requests
-import tempfile
-
 # Saving as a temporary file instead of a buffer to save memory
-with tempfile.TemporaryFile() as temp_csv_file:
-    {{ var_name|default("df") }}.to_csv(temp_csv_file, index=False, header=True)
-    temp_csv_file.seek(0)
-    upload_response = requests.put('{{data_url}}', data=temp_csv_file)
-if upload_response.status_code != 200:
-    raise Exception(f"Error uploading dataframe: {upload_response.content}")
+.temp_file <- tempfile(fileext = ".{{ format|default("csv") }}")
+{% if format == "parquet" -%}
+.dataset_require("arrow")
+arrow::write_parquet({{ var_name|default("df") }}, .temp_file, compression = "{{ compression|default("snappy") }}")
+{% elif format == "arrow" -%}
+.dataset_require("arrow")
+arrow::write_feather({{ var_name|default("df") }}, .temp_file, compression = "{{ compression|default("lz4") }}")
+{% else -%}
+.dataset_write_csv({{ var_name|default("df") }}, .temp_file)
+{% endif -%}
+.upload_status <- system2("curl", c("--silent", "--fail", "--upload-file", shQuote(.temp_file), shQuote("{{data_url}}")))
+unlink(.temp_file)
+if (.upload_status != 0) {
+    stop(paste("Error uploading dataframe: curl exited with status", .upload_status))
+}
@@ -1,3 +1,61 @@
-{% for var_name, data_url in var_map.items() -%}
-{{ var_name }} = read.csv("{{ data_url }}")
+library(jsonlite)
+
+.df_load_operators <- list(
+    "==" = `==`,
+    "!=" = `!=`,
+    "<" = `<`,
+    "<=" = `<=`,
+    ">" = `>`,
+    ">=" = `>=`,
+    "contains" = function(col, value) grepl(as.character(value), as.character(col), fixed = TRUE)
+)
+.df_load_classes <- c(
+    int64 = "integer", int32 = "integer", float64 = "numeric", float32 = "numeric", bool = "logical",
+    string = "character", object = "character", category = "factor", date = "Date"
+)
+
+# The columns to read: the requested ones plus those the row filter tests, which are dropped once rows are filtered.
+.df_load_columns <- function(columns, row_filter) {
+    if (length(columns) == 0) return(NULL)
+    union(unlist(columns), vapply(row_filter, function(.filter) .filter$column, character(1)))
+}
+
+.df_load_filter <- function(df, row_filter, nrows, columns = NULL) {
+    if (length(row_filter) > 0) {
+        .mask <- rep(TRUE, nrow(df))
+        for (.filter in row_filter) {
+            .matches <- .df_load_operators[[.filter$op]](df[[.filter$column]], .filter$value)
+            .mask <- .mask & !is.na(.matches) & .matches
+        }
+        df <- df[.mask, , drop = FALSE]
+    }
+    if (!is.null(nrows)) df <- head(df, nrows)
+    if (length(columns) > 0) df <- df[, unlist(columns), drop = FALSE]
+    df
+}
+
+# Datasets are read from local copies in the shared dataset cache.
+{% for var_name, source in var_map.items() -%}
+.load_options <- fromJSON({{ source.options|tojson|tojson }}, simplifyDataFrame = FALSE)
+{% if source.format == "parquet" -%}
+.dataset_require("arrow")
+{{ var_name }} = .df_load_filter(as.data.frame(arrow::read_parquet("{{ source.path }}", col_select = .df_load_columns(.load_options$columns, .load_options$row_filter))), .load_options$row_filter, .load_options$nrows, .load_options$columns)
+{% elif source.format == "arrow" -%}
+.dataset_require("arrow")
+{{ var_name }} = .df_load_filter(as.data.frame(arrow::read_feather("{{ source.path }}", col_select = .df_load_columns(.load_options$columns, .load_options$row_filter))), .load_options$row_filter, .load_options$nrows, .load_options$columns)
+{% else -%}
+# Types with no R class are left for the reader to infer.
+.classes <- unlist(lapply(.load_options$dtypes, function(.dtype) if (.dtype %in% names(.df_load_classes)) .df_load_classes[[.dtype]]))
+{{ var_name }} = .df_load_filter(
+    .dataset_read_csv(
+        "{{ source.path }}",
+        select = .df_load_columns(.load_options$columns, .load_options$row_filter),
+        col_classes = if (length(.classes) > 0) .classes else NULL,
+        nrows = if (length(.load_options$row_filter) == 0 && !is.null(.load_options$nrows)) .load_options$nrows else -1
+    ),
+    .load_options$row_filter,
+    .load_options$nrows,
+    .load_options$columns
+)
+{% endif -%}
 {% endfor %}
@@ -0,0 +1,50 @@
+# Packages beyond base R that some formats need are checked for before use, so that a missing one fails with a clear
+# message rather than partway through.
+.dataset_require <- function(package) {
+    if (!requireNamespace(package, quietly = TRUE)) {
+        stop(sprintf("The R package '%s' is required for this operation but is not installed in the R kernel.", package), call. = FALSE)
+    }
+}
+
+# CSV files are read and written with data.table's multithreaded fread and fwrite when data.table is installed, and
+# with base R otherwise.
+.dataset_use_data_table <- requireNamespace("data.table", quietly = TRUE)
+.dataset_native_classes <- c("integer", "numeric", "character", "logical")
+
+.dataset_read_csv <- function(path, select = NULL, col_classes = NULL, nrows = -1) {
+    if (.dataset_use_data_table) {
+        native <- col_classes[col_classes %in% .dataset_native_classes]
+        df <- data.table::fread(
+            path,
+            select = select,
+            colClasses = if (length(native) > 0) native else NULL,
+            nrows = if (nrows < 0) Inf else nrows,
+            data.table = FALSE,
+            showProgress = FALSE
+        )
+        # Classes fread can't parse into directly are converted once the file has been read.
+        for (column in intersect(names(col_classes)[!(col_classes %in% .dataset_native_classes)], names(df))) {
+            df[[column]] <- switch(
+                col_classes[[column]],
+                factor = factor(df[[column]]),
+                Date = as.Date(df[[column]]),
+                df[[column]]
+            )
+        }
+        return(df)
+    }
+    # Unselected columns are given the "NULL" class so that read.csv skips them while parsing.
+    header <- names(read.csv(path, nrows = 1, check.names = FALSE))
+    classes <- setNames(rep(NA_character_, length(header)), header)
+    if (!is.null(select)) classes[!(header %in% select)] <- "NULL"
+    for (column in intersect(names(col_classes), header)) classes[[column]] <- col_classes[[column]]
+    read.csv(path, colClasses = classes, check.names = FALSE, nrows = nrows)
+}
+
+.dataset_write_csv <- function(df, path) {
+    if (.dataset_use_data_table) {
+        data.table::fwrite(df, path, showProgress = FALSE)
+    } else {
+        write.csv(df, path, row.names = FALSE)
+    }
+}
@@ -12,6 +12,7 @@ from beaker_kernel.lib.context import BaseContext
 from beaker_kernel.lib.utils import intercept
 
 from .agent import MiraConfigEditAgent
+from askem_beaker.preview_context import ModelPreviewMixin
 
 if TYPE_CHECKING:
     from beaker_kernel.kernel import LLMKernel
@@ -21,7 +22,7 @@ logger = logging.getLogger(__name__)
 
 from mira.sources.amr import model_from_json; 
 
-class MiraConfigEditContext(BaseContext):
+class MiraConfigEditContext(ModelPreviewMixin, BaseContext):
 
     agent_cls = MiraConfigEditAgent
 
@@ -31,12 +32,13 @@ class MiraConfigEditContext(BaseContext):
     var_name: Optional[str] = "model_config"
 
     def __init__(self, beaker_kernel: "LLMKernel", config: Dict[str, Any]) -> None:
+        self.setup_preview()
         self.reset()
         logger.error("initializing...")
         super().__init__(beaker_kernel, self.agent_cls, config)
 
     def reset(self):
-        pass
+        self.reset_preview()
         
     async def setup(self, context_info, parent_header):
         logger.error(f"performing setup...")
@@ -67,7 +69,7 @@ class MiraConfigEditContext(BaseContext):
             self.model_config = model_from_json(self.amr)            
         else:
             raise Exception(f"Model config '{item_id}' not found.")
-        await self.send_mira_preview_message(parent_header=parent_header)
+        await self.send_mira_preview_message(parent_header=parent_header, force=True)
 
     async def load_mira(self):
         command = "\n".join(
@@ -82,18 +84,6 @@ class MiraConfigEditContext(BaseContext):
         print(f"Running command:\n-------\n{command}\n---------")
         await self.execute(command)        
 
-    async def send_mira_preview_message(
-        self, server=None, target_stream=None, data=None, parent_header={}
-    ):
-        try:
-            preview = await self.evaluate(self.get_code("model_preview"), {"var_name": self.var_name, "schema_name": self.schema_name})
-            content = preview["return"]
-            self.beaker_kernel.send_response(
-                "iopub", "model_preview", content, parent_header=parent_header
-            )
-        except Exception as e:
-            raise
-
     @intercept()
     async def save_model_config_request(self, message):
         '''
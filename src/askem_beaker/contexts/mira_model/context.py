@@ -12,6 +12,7 @@ from beaker_kernel.lib.context import BaseContext
 from beaker_kernel.lib.utils import intercept
 
 from .agent import MiraModelAgent
+from askem_beaker.preview_context import ModelPreviewMixin
 from askem_beaker.utils import get_auth
 
 if TYPE_CHECKING:
@@ -21,7 +22,7 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-class MiraModelContext(BaseContext):
+class MiraModelContext(ModelPreviewMixin, BaseContext):
 
     agent_cls = MiraModelAgent
 
@@ -32,6 +33,7 @@ class MiraModelContext(BaseContext):
     schema_name: Optional[str] = "petrinet"
 
     def __init__(self, beaker_kernel: "LLMKernel", config: Dict[str, Any]) -> None:
+        self.setup_preview()
         self.reset()
         self.auth = get_auth()
         super().__init__(beaker_kernel, self.agent_cls, config)
@@ -67,7 +69,7 @@ class MiraModelContext(BaseContext):
             await self.load_mira()
         else:
             raise Exception(f"Model '{item_id}' not found.")
-        await self.send_mira_preview_message(parent_header=parent_header)
+        await self.send_mira_preview_message(parent_header=parent_header, force=True)
 
     async def load_mira(self):
         model_url = f"{os.environ['HMI_SERVER_URL']}/models/{self.model_id}"
@@ -86,6 +88,7 @@ class MiraModelContext(BaseContext):
 
     def reset(self):
         self.model_id = None
+        self.reset_preview()
 
     async def auto_context(self):
         return f"""You are an scientific modeler whose goal is to use the MIRA modeling library to manipulate and stratify Petrinet models in Python.
@@ -121,19 +124,6 @@ If you are asked to manipulate, stratify, or visualize the model, use the genera
         )["return"]
         return json.dumps(amr, indent=2)
 
-    async def send_mira_preview_message(
-        self, server=None, target_stream=None, data=None, parent_header={}
-    ):
-        try:
-
-            preview = await self.evaluate(self.get_code("model_preview", {"var_name": self.var_name, "schema_name": self.schema_name}))
-            content = preview["return"]
-            self.beaker_kernel.send_response(
-                "iopub", "model_preview", content, parent_header=parent_header
-            )
-        except Exception as e:
-            raise
-
     @intercept()
     async def save_amr_request(self, message):
         content = message.content
@@ -1,4 +1,3 @@
-import copy
 import datetime
 import json
 import logging
@@ -12,6 +11,7 @@ from beaker_kernel.lib.context import BaseContext
 from beaker_kernel.lib.utils import intercept
 
 from .agent import MiraModelEditAgent
+from askem_beaker.preview_context import ModelPreviewMixin
 from askem_beaker.utils import get_auth
 
 if TYPE_CHECKING:
@@ -20,8 +20,32 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
-
-class MiraModelEditContext(BaseContext):
+# Number of versions of the model kept in its edit history for undo and redo.
+HISTORY_LIMIT = int(os.environ.get("MODEL_EDIT_HISTORY_LIMIT", 100))
+
+# Edit operations that can be batched in an `apply_edits_request`, by the name of the request that applies each one on
+# its own, mapped to the procedure that performs it.
+EDIT_OPERATIONS = {
+	"reset": "reset",
+	"replace_template_name": "replace_template_name",
+	"replace_state_name": "replace_state_name",
+	"add_natural_conversion_template": "add_natural_conversion_template",
+	"add_natural_production_template": "add_natural_production_template",
+	"add_natural_degradation_template": "add_natural_degradation_template",
+	"add_controlled_conversion_template": "add_controlled_conversion_template",
+	"add_controlled_production_template": "add_controlled_production_template",
+	"add_controlled_degradation_template": "add_controlled_degradation_template",
+	"remove_template": "remove_template",
+	"add_parameter": "add_parameter",
+	"update_parameter": "update_parameter",
+	"add_observable_template": "add_observable",
+	"remove_observable_template": "remove_observable",
+	"replace_ratelaw": "replace_ratelaw",
+	"stratify": "stratify",
+}
+
+
+class MiraModelEditContext(ModelPreviewMixin, BaseContext):
 
 	agent_cls = MiraModelEditAgent
 
@@ -32,6 +56,7 @@ class MiraModelEditContext(BaseContext):
 	schema_name: Optional[str] = "petrinet"
 
 	def __init__(self, beaker_kernel: "LLMKernel", config: Dict[str, Any]) -> None:
+		self.setup_preview()
 		self.reset()
 		self.auth = get_auth()
 		super().__init__(beaker_kernel, self.agent_cls, config)
@@ -47,7 +72,7 @@ class MiraModelEditContext(BaseContext):
 		)
 
 	async def post_execute(self, message):
-		await self.send_mira_preview_message(parent_header=message.parent_header)
+		await self.record_edit("cell", parent_header=message.parent_header)
 
 	async def set_model(self, item_id, item_type="model", agent=None, parent_header={}):
 		if item_type == "model":
@@ -56,22 +81,23 @@ class MiraModelEditContext(BaseContext):
 			meta_url = f"{os.environ['HMI_SERVER_URL']}/models/{self.model_id}"
 			self.amr = requests.get(meta_url, auth=self.auth.requests_auth()).json()
 			self.schema_name = self.amr.get("header",{}).get("schema_name","petrinet")
-		self.original_amr = copy.deepcopy(self.amr)
 		if self.amr:
 			await self.load_mira()
 		else:
 			raise Exception(f"Model '{item_id}' not found.")
-		await self.send_mira_preview_message(parent_header=parent_header)
+		await self.send_mira_preview_message(parent_header=parent_header, force=True)
 
 	async def load_mira(self):
 		model_url = f"{os.environ['HMI_SERVER_URL']}/models/{self.model_id}"
 		command = "\n".join(
 				[
 						self.get_code("setup"),
+						self.get_code("model_journal"),
 						self.get_code("load_model", {
 								"var_name": self.var_name,
 								"model_url": model_url,
 								"auth_header": self.auth.auth_header(),
+								"history_limit": HISTORY_LIMIT,
 						}),
 				]
 		)
@@ -80,18 +106,29 @@ class MiraModelEditContext(BaseContext):
 
 	def reset(self):
 		self.model_id = None
+		self.reset_preview()
+
+	async def record_edit(self, label, parent_header={}):
+		"""
+		Records the model in its edit history as the version following the current one, if it has changed, then sends
+		its preview.
+		"""
+		await self.evaluate(
+			self.get_code("journal_record", {"var_name": self.var_name, "label": label}),
+			parent_header=parent_header,
+		)
+		await self.send_mira_preview_message(parent_header=parent_header)
 
-	async def send_mira_preview_message(
-		self, server=None, target_stream=None, data=None, parent_header={}
-	):
-		try:
-			preview = await self.evaluate(self.get_code("model_preview", {"var_name": self.var_name, "schema_name": self.schema_name}))
-			content = preview["return"]
-			self.beaker_kernel.send_response(
-					"iopub", "model_preview", content, parent_header=parent_header
-			)
-		except Exception as e:
-			raise
+	async def send_history_response(self, msg_type, executed_code, parent_header={}):
+		history = (await self.evaluate("_model_journal.summary()", parent_header=parent_header))["return"]
+		content = {
+			"success": True,
+			"executed_code": executed_code,
+			"history": history,
+		}
+		self.beaker_kernel.send_response(
+			"iopub", msg_type, content, parent_header=parent_header
+		)
 
 	@intercept()
 	async def reset_request(self, message):
@@ -111,8 +148,153 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 				"iopub", "reset_response", content, parent_header=message.header
 		)
+		await self.record_edit("reset", parent_header=message.header)
+
+	@intercept()
+	async def undo_request(self, message):
+		"""
+		Steps the model back `steps` edits in its history.
+		"""
+		content = message.content
+
+		code = self.get_code("undo", {
+			"var_name": self.var_name,
+			"steps": int(content.get("steps", 1)),
+		})
+		result = await self.execute(code)
+
+		await self.send_history_response("undo_response", result["parent"].content["code"], parent_header=message.header)
+		await self.send_mira_preview_message(parent_header=message.header)
+
+	@intercept()
+	async def redo_request(self, message):
+		"""
+		Steps the model forward `steps` edits that were undone.
+		"""
+		content = message.content
+
+		code = self.get_code("redo", {
+			"var_name": self.var_name,
+			"steps": int(content.get("steps", 1)),
+		})
+		result = await self.execute(code)
+
+		await self.send_history_response("redo_response", result["parent"].content["code"], parent_header=message.header)
+		await self.send_mira_preview_message(parent_header=message.header)
+
+	@intercept()
+	async def save_checkpoint_request(self, message):
+		"""
+		Saves the model as a checkpoint with the given `name`, replacing any checkpoint of that name.
+		"""
+		content = message.content
+
+		code = self.get_code("save_checkpoint", {
+			"var_name": self.var_name,
+			"name": content.get("name"),
+		})
+		result = await self.execute(code)
+
+		await self.send_history_response(
+			"save_checkpoint_response", result["parent"].content["code"], parent_header=message.header
+		)
+
+	@intercept()
+	async def restore_checkpoint_request(self, message):
+		"""
+		Restores the model from the checkpoint with the given `name`, as a new version in its history.
+		"""
+		content = message.content
+
+		code = self.get_code("restore_checkpoint", {
+			"var_name": self.var_name,
+			"name": content.get("name"),
+		})
+		result = await self.execute(code)
+
+		await self.send_history_response(
+			"restore_checkpoint_response", result["parent"].content["code"], parent_header=message.header
+		)
 		await self.send_mira_preview_message(parent_header=message.header)
 
+	@intercept()
+	async def apply_edits_request(self, message):
+		"""
+		Applies an ordered list of edits to the model in a single cell, sending one preview once all are applied.
+
+		Each edit is an object with the `type` of the edit, one of the keys of `EDIT_OPERATIONS`, and the same fields
+		as the request that applies that edit on its own. If any edit fails, none of them are applied.
+		"""
+		content = message.content
+
+		edits = content.get("edits") or []
+		unknown = [edit.get("type") for edit in edits if edit.get("type") not in EDIT_OPERATIONS]
+		if not edits or unknown:
+			evalue = f"Unknown edit types: {unknown}" if unknown else "edits must be set on apply_edits requests"
+			logger.error(evalue)
+			self.beaker_kernel.send_response(
+				"iopub", "error", {
+					"ename": "ValueError",
+					"evalue": evalue,
+					"traceback": [""]
+				}, parent_header=message.header
+			)
+			return
+
+		rendered_edits = [
+			{
+				"type": edit["type"],
+				"code": self.get_code(
+					EDIT_OPERATIONS[edit["type"]],
+					{field: value for field, value in edit.items() if field != "type"},
+				),
+			}
+			for edit in edits
+		]
+		# An edit whose rendered code doesn't compile, e.g. from a quote in an expression, would stop the whole cell
+		# from running, so it is reported as the failed edit without running any.
+		for index, rendered_edit in enumerate(rendered_edits):
+			try:
+				compile(rendered_edit["code"], f"<edit {index}>", "exec")
+			except SyntaxError as e:
+				self.beaker_kernel.send_response(
+					"iopub", "apply_edits_response", {
+						"success": False,
+						"applied": 0,
+						"failed_edit": index,
+						"error": f"SyntaxError: {e}",
+					}, parent_header=message.header
+				)
+				return
+
+		code = self.get_code("apply_edits", {
+			"var_name": self.var_name,
+			"edits": rendered_edits,
+		})
+		# Cleared first, so that a cell that fails before reaching the edits isn't read as the result of an earlier one.
+		await self.evaluate("_edits_result = None", parent_header=message.header)
+		result = await self.execute(code)
+		edits_result = (await self.evaluate("_edits_result", parent_header=message.header))["return"]
+		if edits_result is None:
+			edits_result = {"applied": 0, "failed_edit": None, "error": "The edits cell failed to run, see its error output."}
+
+		content = {
+			"success": edits_result["error"] is None,
+			"executed_code": result["parent"].content["code"],
+			"applied": edits_result["applied"],
+		}
+		if edits_result["error"] is not None:
+			# The edits before the one that failed were rolled back along with it.
+			content["applied"] = 0
+			content["failed_edit"] = edits_result.get("failed_edit", edits_result["applied"])
+			content["error"] = edits_result["error"]
+
+		self.beaker_kernel.send_response(
+			"iopub", "apply_edits_response", content, parent_header=message.header
+		)
+		if content["success"]:
+			await self.record_edit("apply_edits", parent_header=message.header)
+
 	@intercept()
 	async def replace_template_name_request(self, message):
 		content = message.content
@@ -133,7 +315,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "replace_template_name_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("replace_template_name", parent_header=message.header)
 
 	@intercept()
 	async def replace_state_name_request(self, message):
@@ -157,7 +339,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "replace_state_name_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("replace_state_name", parent_header=message.header)
 
 	@intercept()
 	async def add_natural_conversion_template_request(self, message):
@@ -195,7 +377,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "add_natural_conversion_template_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("add_natural_conversion_template", parent_header=message.header)
 
 	@intercept()
 	async def add_natural_production_template_request(self, message):
@@ -229,7 +411,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "add_natural_production_template_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("add_natural_production_template", parent_header=message.header)
 
 	@intercept()
 	async def add_natural_degradation_template_request(self, message):
@@ -263,7 +445,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "add_natural_degradation_template_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("add_natural_degradation_template", parent_header=message.header)
 
 	@intercept()
 	async def add_controlled_conversion_template_request(self, message):
@@ -305,7 +487,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "add_controlled_conversion_template_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("add_controlled_conversion_template", parent_header=message.header)
 
 	@intercept()
 	async def add_controlled_production_template_request(self, message):
@@ -343,7 +525,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "add_controlled_production_template_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("add_controlled_production_template", parent_header=message.header)
 
 	@intercept()
 	async def add_controlled_degradation_template_request(self, message):
@@ -381,7 +563,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "add_controlled_degradation_template_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("add_controlled_degradation_template", parent_header=message.header)
 
 	@intercept()
 	async def remove_template_request(self, message):
@@ -401,7 +583,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "remove_template_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("remove_template", parent_header=message.header)
 
 	@intercept()
 	async def add_parameter_request(self, message):
@@ -431,7 +613,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "add_parameter_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("add_parameter", parent_header=message.header)
 
 	@intercept()
 	async def update_parameter_request(self, message):
@@ -453,7 +635,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "update_parameter_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("update_parameter", parent_header=message.header)
 
 	@intercept()
 	async def add_observable_template_request(self, message):
@@ -477,7 +659,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "add_observable_template_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("add_observable_template", parent_header=message.header)
 
 	@intercept()
 	async def remove_observable_template_request(self, message):
@@ -497,7 +679,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "remove_observable_template_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("remove_observable_template", parent_header=message.header)
 
 	@intercept()
 	async def replace_ratelaw_request(self, message):
@@ -520,7 +702,7 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 			"iopub", "replace_ratelaw_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("replace_ratelaw", parent_header=message.header)
 
 	@intercept()
 	async def amr_to_templates(self, message):
@@ -569,4 +751,4 @@ class MiraModelEditContext(BaseContext):
 		self.beaker_kernel.send_response(
 		    "iopub", "stratify_response", content, parent_header=message.header
 		)
-		await self.send_mira_preview_message(parent_header=message.header)
+		await self.record_edit("stratify", parent_header=message.header)
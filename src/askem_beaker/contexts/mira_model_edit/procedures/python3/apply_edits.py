@@ -0,0 +1,14 @@
+# The edits are applied in order as a single transaction: if any of them fails, the model is restored to its version
+# in the edit history from before the first.
+_model_journal.record({{ var_name|default("model") }}, "cell")
+_edits_result = {"applied": 0, "total": {{ edits|length }}, "error": None}
+try:
+{%- for edit in edits %}
+
+    # Edit {{ loop.index }} of {{ edits|length }}: {{ edit.type }}
+    {{ edit.code|indent(4) }}
+    _edits_result["applied"] += 1
+{%- endfor %}
+except Exception as _edits_error:
+    {{ var_name|default("model") }} = _model_journal.current()
+    _edits_result["error"] = f"{type(_edits_error).__name__}: {_edits_error}"
@@ -0,0 +1 @@
+_model_journal.record({{ var_name|default("model") }}, {{ label|tojson }})
@@ -1,4 +1,4 @@
-import copy, requests
+import requests
 amr_json = requests.get("{{ model_url }}", headers={{auth_header}}).json()
 {{ var_name|default("model") }} = model_from_json(amr_json)
-_model_orig = copy.deepcopy({{ var_name|default("model") }})
+_model_journal = ModelJournal({{ var_name|default("model") }}, limit={{ history_limit|default(100) }})
@@ -0,0 +1,114 @@
+import hashlib
+import json
+
+
+class ModelJournal:
+    """
+    Undo/redo history and named checkpoints of a template model.
+
+    Each version of the model is stored as keys into a store of serialized templates, parameters, initials and
+    observables shared by all versions, so a version only adds the parts of the model its edit changed rather than a
+    full copy. Models are rebuilt from the store, so edits made in place to the current model never reach the history.
+    """
+
+    def __init__(self, model: TemplateModel, limit: int = 100):
+        self.limit = limit
+        self.store = {}
+        self.versions = []
+        self.position = -1
+        self.checkpoints = {}
+        self.initial = self.snapshot(model)
+        self.versions.append(("load", self.initial))
+        self.position = 0
+
+    def put(self, serialized: str) -> str:
+        key = hashlib.sha1(serialized.encode()).hexdigest()
+        self.store.setdefault(key, serialized)
+        return key
+
+    def snapshot(self, model: TemplateModel) -> tuple:
+        model_data = json.loads(model.json())
+        templates = tuple(self.put(json.dumps(template, sort_keys=True)) for template in model_data.pop("templates", []))
+        mappings = tuple(
+            tuple(
+                (name, self.put(json.dumps(value, sort_keys=True)))
+                for name, value in (model_data.pop(field, None) or {}).items()
+            )
+            for field in ("parameters", "initials", "observables")
+        )
+        rest = self.put(json.dumps(model_data, sort_keys=True))
+        return (rest, templates) + mappings
+
+    def build(self, version: tuple) -> TemplateModel:
+        rest, templates, parameters, initials, observables = version
+        model_data = json.loads(self.store[rest])
+        model_data["templates"] = [json.loads(self.store[key]) for key in templates]
+        for field, entries in (("parameters", parameters), ("initials", initials), ("observables", observables)):
+            model_data[field] = {name: json.loads(self.store[key]) for name, key in entries}
+        return TemplateModel.from_json(model_data)
+
+    def collect(self):
+        """
+        Drops the serialized parts no longer used by any version or checkpoint.
+        """
+        live = set()
+        for version in [self.initial, *(version for _, version in self.versions), *self.checkpoints.values()]:
+            rest, templates, *mappings = version
+            live.add(rest)
+            live.update(templates)
+            for entries in mappings:
+                live.update(key for _, key in entries)
+        self.store = {key: value for key, value in self.store.items() if key in live}
+
+    def record(self, model: TemplateModel, label: str) -> bool:
+        """
+        Records the model as a new version following the current one, discarding any versions that were undone.
+        Returns whether the model differed from the current version.
+        """
+        version = self.snapshot(model)
+        if version == self.versions[self.position][1]:
+            return False
+        dropped = len(self.versions) - self.position - 1
+        del self.versions[self.position + 1:]
+        self.versions.append((label, version))
+        if len(self.versions) > self.limit:
+            del self.versions[:len(self.versions) - self.limit]
+            dropped += 1
+        self.position = len(self.versions) - 1
+        if dropped:
+            self.collect()
+        return True
+
+    def current(self) -> TemplateModel:
+        return self.build(self.versions[self.position][1])
+
+    def original(self) -> TemplateModel:
+        return self.build(self.initial)
+
+    def undo(self, steps: int = 1) -> TemplateModel:
+        self.position = max(0, self.position - steps)
+        return self.current()
+
+    def redo(self, steps: int = 1) -> TemplateModel:
+        self.position = min(len(self.versions) - 1, self.position + steps)
+        return self.current()
+
+    def save_checkpoint(self, model: TemplateModel, name: str):
+        replaced = name in self.checkpoints
+        self.checkpoints[name] = self.snapshot(model)
+        if replaced:
+            self.collect()
+
+    def restore_checkpoint(self, name: str) -> TemplateModel:
+        if name not in self.checkpoints:
+            raise ValueError(f"Checkpoint '{name}' not found, expected one of {sorted(self.checkpoints)}.")
+        return self.build(self.checkpoints[name])
+
+    def summary(self) -> dict:
+        return {
+            "versions": [label for label, _ in self.versions],
+            "position": self.position,
+            "can_undo": self.position > 0,
+            "can_redo": self.position < len(self.versions) - 1,
+            "checkpoints": sorted(self.checkpoints),
+        }
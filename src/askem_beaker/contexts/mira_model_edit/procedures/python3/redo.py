@@ -0,0 +1 @@
+{{ var_name|default("model") }} = _model_journal.redo({{ steps|default(1) }})
@@ -1,2 +1 @@
-import copy
-{{ var_name|default("model") }} = copy.deepcopy(_model_orig)
+{{ var_name|default("model") }} = _model_journal.original()
@@ -0,0 +1,2 @@
+{{ var_name|default("model") }} = _model_journal.restore_checkpoint({{ name|tojson }})
+_model_journal.record({{ var_name|default("model") }}, {{ ("restore_checkpoint " ~ name)|tojson }})
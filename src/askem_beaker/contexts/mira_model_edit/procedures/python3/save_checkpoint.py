@@ -0,0 +1 @@
+_model_journal.save_checkpoint({{ var_name|default("model") }}, {{ name|tojson }})
@@ -0,0 +1 @@
+{{ var_name|default("model") }} = _model_journal.undo({{ steps|default(1) }})
@@ -0,0 +1,116 @@
+"""
+RFC 6902 JSON patches between versions of a JSON document, used to send model previews as the changes from the last
+preview sent.
+
+This module is imported from within the subkernel by the model preview procedures, so it must only depend on the
+standard library.
+"""
+import difflib
+import json
+import os
+
+# Patches larger than this ratio of the serialized size of the full document are sent as the full document instead.
+MAX_PATCH_RATIO = float(os.environ.get("MODEL_PREVIEW_MAX_PATCH_RATIO", 0.5))
+
+
+def escape_pointer(key) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def unescape_pointer(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def serialize_items(items: list) -> list[str]:
+    return [json.dumps(item, sort_keys=True) for item in items]
+
+
+def make_patch(source, target, path: str = "") -> list[dict]:
+    """
+    Returns the `add`, `remove` and `replace` operations that turn the document `source` into `target`.
+    """
+    if type(source) is not type(target):
+        return [{"op": "replace", "path": path, "value": target}]
+
+    if isinstance(source, dict):
+        operations = []
+        for key in source:
+            if key not in target:
+                operations.append({"op": "remove", "path": f"{path}/{escape_pointer(key)}"})
+        for key, value in target.items():
+            if key not in source:
+                operations.append({"op": "add", "path": f"{path}/{escape_pointer(key)}", "value": value})
+            else:
+                operations.extend(make_patch(source[key], value, f"{path}/{escape_pointer(key)}"))
+        return operations
+
+    if isinstance(source, list):
+        if source == target:
+            return []
+        # Items are aligned by their serialized form, so that inserting or removing items produces operations for only
+        # those items rather than for every item after them. The differences are patched from the end of the list
+        # backwards, so the indices of the items before each one are still those of `source`.
+        matcher = difflib.SequenceMatcher(None, serialize_items(source), serialize_items(target), autojunk=False)
+        operations = []
+        for tag, source_start, source_end, target_start, target_end in reversed(matcher.get_opcodes()):
+            if tag == "equal":
+                continue
+            common = min(source_end - source_start, target_end - target_start)
+            for offset in range(common):
+                operations.extend(
+                    make_patch(source[source_start + offset], target[target_start + offset], f"{path}/{source_start + offset}")
+                )
+            for index in reversed(range(source_start + common, source_end)):
+                operations.append({"op": "remove", "path": f"{path}/{index}"})
+            for offset in range(common, target_end - target_start):
+                operations.append(
+                    {"op": "add", "path": f"{path}/{source_start + offset}", "value": target[target_start + offset]}
+                )
+        return operations
+
+    if source != target:
+        return [{"op": "replace", "path": path, "value": target}]
+    return []
+
+
+def apply_patch(document, patch: list[dict]):
+    """
+    Returns the result of applying the `add`, `remove` and `replace` operations of `patch` to `document`.
+
+    `document` is left unchanged: only the containers along the paths the patch changes are copied, and the rest are
+    shared with the result.
+    """
+    copied = set()
+
+    def container(parent, key):
+        child = parent[key]
+        if id(child) not in copied:
+            child = child.copy()
+            parent[key] = child
+            copied.add(id(child))
+        return child
+
+    root = {"": document}
+    for operation in patch:
+        tokens = [unescape_pointer(token) for token in operation["path"].split("/")]
+        parent, key = root, ""
+        for token in tokens[1:]:
+            parent = container(parent, key)
+            if isinstance(parent, list):
+                key = len(parent) if token == "-" else int(token)
+            else:
+                key = token
+        op = operation["op"]
+        if op == "add" and isinstance(parent, list):
+            parent.insert(key, operation["value"])
+        elif op in ("add", "replace"):
+            parent[key] = operation["value"]
+        elif op == "remove":
+            del parent[key]
+        else:
+            raise ValueError(f"Unsupported JSON patch operation '{op}'")
+    return root[""]
+
+
+def patch_size_ratio(patch: list[dict], document) -> float:
+    return len(json.dumps(patch)) / max(len(json.dumps(document)), 1)
@@ -0,0 +1,60 @@
+"""
+Builds the payloads of model preview messages from MIRA template models.
+
+This module is imported from within the subkernel by the model preview procedures, so it must only depend on the
+standard library and MIRA.
+"""
+import hashlib
+
+from askem_beaker.json_patch import MAX_PATCH_RATIO, make_patch, patch_size_ratio
+
+# The version and AMR of the last preview built, which the next preview is sent as a patch against.
+_last_sent = None
+
+
+def model_to_amr(model, schema_name: str) -> dict:
+    from mira.modeling.amr.petrinet import template_model_to_petrinet_json
+    from mira.modeling.amr.regnet import template_model_to_regnet_json
+    from mira.modeling.amr.stockflow import template_model_to_stockflow_json
+
+    if schema_name == "regnet":
+        return template_model_to_regnet_json(model)
+    elif schema_name == "stockflow":
+        return template_model_to_stockflow_json(model)
+    return template_model_to_petrinet_json(model)
+
+
+def model_preview(model, schema_name: str, last_hash: str|None = None, max_patch_ratio: float = MAX_PATCH_RATIO) -> dict:
+    """
+    Returns the payload of a preview of `model` as an AMR of the schema `schema_name`, or only whether it is unchanged
+    if its hash is `last_hash`, the hash of the last preview the context sent.
+
+    The hash of the model is the `version` of its AMR. When the last preview built is the one the context sent, only
+    the changes from its AMR are returned, as a JSON patch, unless the patch is more than `max_patch_ratio` of the size
+    of the AMR. The `structure` hash covers only the templates and their concepts, which are all the graph image of the
+    model depends on.
+    """
+    global _last_sent
+
+    # Serializing the template model is far cheaper than converting it to an AMR, so the preview is only rebuilt when
+    # this hash differs from the one of the last preview sent.
+    version = hashlib.sha256(f"{schema_name}\0{model.json()}".encode()).hexdigest()
+    if version == last_hash:
+        return {"unchanged": True, "version": version}
+
+    amr = model_to_amr(model, schema_name)
+    templates = "\0".join(template.json(exclude={"rate_law"}) for template in model.templates)
+    structure = hashlib.sha256(f"{schema_name}\0{templates}".encode()).hexdigest()
+    result = {"version": version, "structure": structure}
+    patch = None
+    if _last_sent is not None and last_hash is not None and _last_sent["version"] == last_hash:
+        patch = make_patch(_last_sent["amr"], amr)
+        if patch_size_ratio(patch, amr) > max_patch_ratio:
+            patch = None
+    if patch is None:
+        result["application/json"] = amr
+    else:
+        result["base_version"] = last_hash
+        result["application/json-patch+json"] = patch
+    _last_sent = {"version": version, "amr": amr}
+    return result
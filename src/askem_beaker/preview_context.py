@@ -0,0 +1,98 @@
+import asyncio
+import logging
+
+from beaker_kernel.lib.utils import intercept
+
+from askem_beaker.json_patch import MAX_PATCH_RATIO, apply_patch
+from askem_beaker.preview_renderer import ModelPreviewRenderer
+
+logger = logging.getLogger(__name__)
+
+
+class ModelPreviewMixin:
+    """
+    Sends the `model_preview` and `model_preview_image` messages of the contexts that edit MIRA models.
+
+    Contexts using it define `var_name` and `schema_name` and a `model_preview` procedure calling
+    `askem_beaker.model_preview.model_preview`, call `setup_preview()` before initializing `BaseContext`, and call
+    `reset_preview()` when they are reset.
+    """
+
+    def setup_preview(self):
+        self.preview_renderer = ModelPreviewRenderer()
+        self.preview_image_task = None
+        self.reset_preview()
+
+    def reset_preview(self):
+        # Hash of the model the last preview sent was built from, which is the version of the AMR sent, and the AMR.
+        self.preview_hash = None
+        self.preview_amr = None
+
+    async def send_mira_preview_message(
+        self, server=None, target_stream=None, data=None, parent_header={}, force=False
+    ):
+        """
+        Sends a `model_preview` message, unless the model hasn't changed since the last preview was sent. Setting
+        `force` sends the preview regardless.
+
+        The AMR is sent as a JSON patch from the version of the last preview sent when the patch is small enough, and in
+        full otherwise or when `force` is set.
+        """
+        preview = await self.evaluate(
+            self.get_code(
+                "model_preview",
+                {
+                    "var_name": self.var_name,
+                    "schema_name": self.schema_name,
+                    "last_hash": None if force else self.preview_hash,
+                    "max_patch_ratio": MAX_PATCH_RATIO,
+                },
+            )
+        )
+        content = preview["return"]
+        if content.get("unchanged", False):
+            return
+        if "application/json-patch+json" in content:
+            self.preview_amr = apply_patch(self.preview_amr, content["application/json-patch+json"])
+        else:
+            self.preview_amr = content["application/json"]
+        self.preview_hash = content["version"]
+        structure_hash = content.pop("structure")
+        self.beaker_kernel.send_response(
+            "iopub", "model_preview", content, parent_header=parent_header
+        )
+        # The image follows in its own message once rendered, superseding any render still in flight.
+        if self.preview_image_task is not None and not self.preview_image_task.done():
+            self.preview_image_task.cancel()
+        self.preview_image_task = asyncio.create_task(
+            self.send_preview_image(self.preview_hash, structure_hash, self.preview_amr, parent_header=parent_header)
+        )
+
+    async def send_preview_image(self, model_hash, structure_hash, amr, parent_header={}):
+        """
+        Sends a `model_preview_image` message with the rendered graph of the model once it is ready. Images are cached
+        by `structure_hash`, so models differing only in their values share an image.
+        """
+        try:
+            image = await self.preview_renderer.render(structure_hash, amr)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Unable to render model preview image: {e}")
+            return
+        self.beaker_kernel.send_response(
+            "iopub", "model_preview_image", {"hash": model_hash, **image}, parent_header=parent_header
+        )
+
+    def cleanup(self):
+        if self.preview_image_task is not None and not self.preview_image_task.done():
+            self.preview_image_task.cancel()
+        self.preview_renderer.shutdown()
+        super().cleanup()
+
+    @intercept()
+    async def model_preview_request(self, message):
+        """
+        Resends the model preview even if the model hasn't changed, for clients that need to refresh it.
+        """
+        await self.send_mira_preview_message(parent_header=message.header, force=True)
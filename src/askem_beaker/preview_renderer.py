@@ -0,0 +1,103 @@
+import asyncio
+import base64
+import concurrent.futures
+import contextlib
+import logging
+import multiprocessing
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "askem_beaker", "model_previews")
+IMAGE_MIME_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+
+def render_model_image(amr: dict, path: str, image_format: str = "png") -> str:
+    """
+    Lays out the graph of the model described by `amr` and writes it as an image to `path`. This runs in the
+    renderer's worker process.
+    """
+    from mira.modeling.viz import GraphicalModel
+    from mira.sources.amr import model_from_json
+
+    template_model = model_from_json(amr)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=f".{image_format}")
+    os.close(fd)
+    try:
+        GraphicalModel.from_template_model(template_model).write(temp_path, format=image_format)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+class ModelPreviewRenderer:
+    """
+    Renders model preview images in a worker process, so that laying out the graphs of large models never blocks
+    the kernel or the subkernel.
+
+    Images are cached on disk by a hash of the model's structure, its templates and their concepts but not its values,
+    and the image format, so a model whose graph has been rendered before, in this kernel or any other on the host, is
+    not laid out again.
+    """
+
+    def __init__(self, cache_dir: str = None, image_format: str = None) -> None:
+        self.cache_dir = cache_dir or os.environ.get("MODEL_PREVIEW_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.image_format = image_format or os.environ.get("MODEL_PREVIEW_IMAGE_FORMAT", "png")
+        if self.image_format not in IMAGE_MIME_TYPES:
+            raise ValueError(f"Unsupported model preview image format '{self.image_format}'")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._executor = None
+        self._pending = {}
+
+    @property
+    def executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned rather than forked, as the kernel process has threads and an event loop running.
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def image_path(self, structure_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{structure_hash}.{self.image_format}")
+
+    def read_image(self, path: str) -> str:
+        with open(path, "rb") as image_file:
+            data = image_file.read()
+        if self.image_format == "svg":
+            return data.decode("utf-8")
+        return base64.b64encode(data).decode("ascii")
+
+    async def render(self, structure_hash: str, amr: dict) -> dict[str, str]:
+        """
+        Returns the preview image of the model as display data keyed by mime type, rendering it if it isn't cached.
+        """
+        path = self.image_path(structure_hash)
+        if not os.path.exists(path):
+            future = self._pending.get(path, None)
+            if future is None:
+                future = asyncio.get_running_loop().run_in_executor(
+                    self.executor, render_model_image, amr, path, self.image_format
+                )
+                self._pending[path] = future
+                future.add_done_callback(lambda _: self._pending.pop(path, None))
+            try:
+                # Shielded so that a superseded request still finishes warming the cache.
+                await asyncio.shield(future)
+            except concurrent.futures.process.BrokenProcessPool:
+                self._executor = None
+                raise
+        data = await asyncio.to_thread(self.read_image, path)
+        return {IMAGE_MIME_TYPES[self.image_format]: data}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
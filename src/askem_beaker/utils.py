@@ -1,8 +1,16 @@
 import os
 from base64 import b64encode
 from typing import TYPE_CHECKING, Any, Dict
+
+import httpx
 from requests.auth import HTTPBasicAuth
 
+# Seconds allowed for any single request to HMI-Server before it is abandoned.
+HMI_REQUEST_TIMEOUT = float(os.environ.get("HMI_REQUEST_TIMEOUT", 30))
+# Maximum number of simultaneous connections held open to HMI-Server.
+HMI_MAX_CONNECTIONS = int(os.environ.get("HMI_MAX_CONNECTIONS", 10))
+
+
 class TerariumAuth:
     username: str
     password: str
@@ -24,9 +32,28 @@ class TerariumAuth:
         else:
             return None
 
+    def httpx_auth(self) -> httpx.BasicAuth:
+        if self.username and self.password:
+            return httpx.BasicAuth(self.username, self.password)
+        else:
+            return None
+
 
 def get_auth() -> TerariumAuth|None:
     try:
         return TerariumAuth()
     except ValueError:
         return None
+
+
+def hmi_async_client(auth: TerariumAuth|None = None) -> httpx.AsyncClient:
+    """
+    Returns a connection-pooled async client for talking to HMI-Server, so that several assets can be
+    resolved concurrently without blocking the kernel's event loop.
+    """
+    return httpx.AsyncClient(
+        base_url=os.environ["HMI_SERVER_URL"],
+        auth=auth.httpx_auth() if auth else None,
+        timeout=HMI_REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_connections=HMI_MAX_CONNECTIONS),
+    )
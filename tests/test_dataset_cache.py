@@ -0,0 +1,53 @@
+import asyncio
+import os
+
+import httpx
+
+from askem_beaker.contexts.dataset.lib.cache import DatasetCache
+
+
+def test_fetch_reuses_cached_copy(tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=b"a,b\n1,2\n", headers={"ETag": '"v1"'})
+
+    async def fetch_twice():
+        cache = DatasetCache(root=str(tmp_path))
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await cache.fetch(client, "https://example.com/data.csv", "asset", "data.csv")
+            os.utime(cache.meta_path(cache.cache_key("asset", "data.csv")), (0, 0))
+            second = await cache.fetch(client, "https://example.com/data.csv", "asset", "data.csv")
+        return cache, first, second
+
+    cache, first, second = asyncio.run(fetch_twice())
+
+    assert first == second
+    with open(second, "rb") as data_file:
+        assert data_file.read() == b"a,b\n1,2\n"
+    assert [request.headers.get("If-None-Match") for request in requests] == [None, '"v1"']
+    # Reusing the entry marks it as recently used.
+    assert os.path.getmtime(cache.meta_path(cache.cache_key("asset", "data.csv"))) > 0
+
+
+def test_fetch_trusts_versioned_entry_without_etag(tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=b"a\n1\n")
+
+    async def fetch_twice():
+        cache = DatasetCache(root=str(tmp_path))
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await cache.fetch(client, "https://example.com/data.csv", "asset", "data.csv", version="3")
+            second = await cache.fetch(client, "https://example.com/data.csv", "asset", "data.csv", version="3")
+        return first, second
+
+    first, second = asyncio.run(fetch_twice())
+
+    assert first == second
+    assert len(requests) == 1